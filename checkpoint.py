@@ -0,0 +1,96 @@
+import os, json, time
+from pacing import file_lock
+
+STAGES = ('fetched', 'rendered', 'written')
+
+
+class Checkpoint:
+    """Per-ticker progress journal for a refresh run, kept as append-only JSON lines.
+
+    Each entry records the last stage reached (fetched -> rendered -> written) with
+    the payload needed to continue from it: fetched data, then rendered blocks.
+    mark() appends one line carrying only that stage's payload, so a run writes each
+    payload once instead of rewriting the whole journal per stage. Entries older
+    than `max_age` seconds are ignored, so a rerun resumes only recent work and
+    refreshes everything else from scratch.
+
+    Appends and the load-time compaction take a lock file next to the journal, so the
+    shards of one run can share a journal: the file depends only on the run name, and
+    changing --shards keeps the resume state.
+    """
+
+    def __init__(self, path, max_age=20 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.data = {}
+        with file_lock(path + '.lock'):
+            lines = self._load()
+            # drop superseded lines, written payloads and expired entries before this run appends more
+            if lines > len(self.data):
+                self._rewrite()
+
+    def _load(self):
+        lines = 0
+        try:
+            f = open(self.path)
+        except OSError:
+            return 0
+        now = time.time()
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:  # torn last line of a killed run
+                    continue
+                lines += 1
+                key = rec.pop('key', None)
+                if key is None:
+                    continue
+                e = self.data.get(key) or {}
+                if 'stage' in rec:
+                    e = self._apply(e, rec)
+                else:
+                    e = dict(e, **rec)
+                self.data[key] = e
+        self.data = {k: e for k, e in self.data.items() if e.get('stage') in STAGES and now - e.get('at', 0) <= self.max_age}
+        return lines
+
+    @staticmethod
+    def _apply(e, rec):
+        e = dict(e)
+        if rec['stage'] == 'written':
+            e.pop('data', None)
+            e.pop('blocks', None)
+        e.pop('error', None)
+        e.update(rec)
+        return e
+
+    def _rewrite(self):
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            for key, e in self.data.items():
+                f.write(json.dumps(dict(e, key=key), ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
+
+    def _append(self, rec):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        line = json.dumps(rec, ensure_ascii=False) + '\n'
+        with file_lock(self.path + '.lock'), open(self.path, 'a') as f:
+            f.write(line)
+
+    def resume_point(self, key):
+        """(stage, entry) for a fresh entry, else (None, None)."""
+        e = self.data.get(key)
+        if not e or e.get('stage') not in STAGES or time.time() - e.get('at', 0) > self.max_age:
+            return None, None
+        return e['stage'], e
+
+    def mark(self, key, stage, **payload):
+        rec = dict(payload, stage=stage, at=time.time())
+        self.data[key] = self._apply(self.data.get(key) or {}, rec)
+        self._append(dict(rec, key=key))
+
+    def fail(self, key, err):
+        if key in self.data:
+            self.data[key]['error'] = err
+            self._append({'key': key, 'error': err})
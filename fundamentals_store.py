@@ -0,0 +1,195 @@
+import os, sys, json, math, time, array, struct, argparse, threading
+from pacing import file_lock
+
+MAGIC = b'FUNDCOL1'
+METRICS = ('revenue', 'op_income', 'net_income', 'fcf')
+
+
+class FundamentalsStore:
+    """Annual fundamentals per (ticker, fiscal year), stored column-wise.
+
+    One row per (ticker, year); the ticker and source columns hold indexes into
+    small name tables, every metric is an array of doubles with NaN for "not
+    reported". The file is a JSON header followed by the raw column buffers, so
+    loading is a handful of array.frombytes() calls and a cross-ticker query
+    touches only the metric column it reads.
+
+    Rows come in and go out in the providers' shape:
+    [(fiscal_year, revenue, operating_income, net_income, fcf), ...].
+
+    save() merges with the file as it is on disk, so processes sharing the
+    store (run shards) keep each other's tickers.
+
+    Refresh times are kept per (ticker, source): rows merged in from one provider
+    do not make another provider's copy look fresh.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.tickers, self.sources = [], []
+        self.fetched = {}
+        self.cols = self._empty()
+        self._index = {}
+        self._by_ticker = {}
+        self._touched = set()
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                self._load()
+            except Exception:
+                self.tickers, self.sources, self.fetched, self.cols = [], [], {}, self._empty()
+            self._reindex()
+
+    @staticmethod
+    def _empty():
+        cols = {'ticker': array.array('H'), 'year': array.array('H'), 'source': array.array('B')}
+        cols.update((m, array.array('d')) for m in METRICS)
+        return cols
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('not a fundamentals store')
+            (n,) = struct.unpack('<I', f.read(4))
+            head = json.loads(f.read(n).decode('utf-8'))
+            cols = self._empty()
+            for name in head['columns']:
+                col = cols[name]
+                col.frombytes(f.read(head['rows'] * col.itemsize))
+                if sys.byteorder == 'big':
+                    col.byteswap()
+        # files written before per-source refresh times held one timestamp per ticker
+        fetched = {tk: v if isinstance(v, dict) else {'': v} for tk, v in head['fetched'].items()}
+        self.tickers, self.sources, self.fetched, self.cols = head['tickers'], head['sources'], fetched, cols
+
+    def _reindex(self):
+        self._index, self._by_ticker = {}, {}
+        t, y = self.cols['ticker'], self.cols['year']
+        for i in range(len(t)):
+            tk = self.tickers[t[i]]
+            self._index[(tk, y[i])] = i
+            self._by_ticker.setdefault(tk, []).append(i)
+        for rows in self._by_ticker.values():
+            rows.sort(key=y.__getitem__)
+
+    @staticmethod
+    def _code(table, name):
+        if name not in table:
+            table.append(name)
+        return table.index(name)
+
+    def _put(self, ticker, year, values, source):
+        i = self._index.get((ticker, year))
+        if i is None:
+            i = len(self.cols['year'])
+            self.cols['ticker'].append(self._code(self.tickers, ticker))
+            self.cols['year'].append(year)
+            self.cols['source'].append(self._code(self.sources, source or ''))
+            for m in METRICS:
+                self.cols[m].append(math.nan)
+            self._index[(ticker, year)] = i
+            rows_of = self._by_ticker.setdefault(ticker, [])
+            rows_of.append(i)
+            rows_of.sort(key=self.cols['year'].__getitem__)
+        elif source:
+            self.cols['source'][i] = self._code(self.sources, source)
+        for m, v in zip(METRICS, values):
+            if v is not None:
+                self.cols[m][i] = float(v)
+
+    def upsert(self, ticker, rows, source=None):
+        """Insert or update rows; values that are None leave the stored value alone."""
+        with self.lock:
+            for row in rows or ():
+                try:
+                    year = int(str(row[0])[:4])
+                except ValueError:
+                    continue
+                self._put(ticker, year, row[1:], source)
+            self.fetched.setdefault(ticker, {})[source or ''] = time.time()
+            self._touched.add(ticker)
+            self.dirty = True
+
+    def latest_year(self, ticker):
+        with self.lock:
+            rows = self._by_ticker.get(ticker)
+            return self.cols['year'][rows[-1]] if rows else None
+
+    def fresh(self, ticker, max_age, source=None):
+        """True when `ticker` was refreshed (from `source`, if given) less than `max_age` seconds ago."""
+        times = self.fetched.get(ticker, {})
+        at = times.get(source or '', 0) if source is not None else max(times.values(), default=0)
+        return time.time() - at < max_age
+
+    def history(self, ticker, n=5):
+        """Newest-first rows for `ticker`, metrics None where not reported."""
+        with self.lock:
+            out = []
+            for i in reversed(self._by_ticker.get(ticker, [])[-n:] if n else self._by_ticker.get(ticker, [])):
+                vals = tuple(None if math.isnan(self.cols[m][i]) else self.cols[m][i] for m in METRICS)
+                out.append((str(self.cols['year'][i]),) + vals)
+            return out
+
+    def trend(self, metric, tickers=None, n=5):
+        """{ticker: [(year, value), ...] oldest first} over the last `n` years, e.g. FCF for every target."""
+        col, years = self.cols[metric], self.cols['year']
+        with self.lock:
+            out = {}
+            for tk in tickers or sorted(self._by_ticker):
+                rows = self._by_ticker.get(tk, [])[-n:] if n else self._by_ticker.get(tk, [])
+                out[tk] = [(years[i], None if math.isnan(col[i]) else col[i]) for i in rows]
+            return out
+
+    def _merge_disk(self):
+        try:
+            disk = FundamentalsStore(self.path)
+        except OSError:
+            return
+        for tk, rows in disk._by_ticker.items():
+            if tk in self._touched:
+                continue
+            for i in rows:
+                vals = [None if math.isnan(disk.cols[m][i]) else disk.cols[m][i] for m in METRICS]
+                self._put(tk, disk.cols['year'][i], vals, disk.sources[disk.cols['source'][i]])
+            self.fetched[tk] = dict(disk.fetched.get(tk, {}))
+
+    def save(self):
+        with self.lock, file_lock(self.path + '.lock'):
+            if not self.dirty:
+                return
+            if os.path.exists(self.path):
+                self._merge_disk()
+            names = ['ticker', 'year', 'source'] + list(METRICS)
+            head = json.dumps({'rows': len(self.cols['year']), 'columns': names, 'tickers': self.tickers,
+                               'sources': self.sources, 'fetched': self.fetched}).encode('utf-8')
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(MAGIC + struct.pack('<I', len(head)) + head)
+                for name in names:
+                    col = self.cols[name]
+                    if sys.byteorder == 'big':
+                        col = array.array(col.typecode, col)
+                        col.byteswap()
+                    f.write(col.tobytes())
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    def stats(self):
+        with self.lock:
+            return {'tickers': len(self._by_ticker), 'rows': len(self.cols['year'])}
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Query the fundamentals store, e.g. FCF trend for every ticker')
+    ap.add_argument('metric', choices=METRICS)
+    ap.add_argument('tickers', nargs='*')
+    ap.add_argument('--years', type=int, default=5)
+    ap.add_argument('--path', default='/home/soyu/.openclaw/workspace/memory/fundamentals.col')
+    args = ap.parse_args()
+    print(json.dumps(FundamentalsStore(args.path).trend(args.metric, args.tickers or None, args.years), indent=2))
+
+
+if __name__ == '__main__':
+    main()
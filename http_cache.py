@@ -0,0 +1,101 @@
+import os, json, time, hashlib, threading
+
+
+class CachedFetcher:
+    """GET with a per-run memo and an on-disk conditional-request cache.
+
+    - each URL hits the network at most once per run; later calls get the memo
+    - bodies are stored on disk with their ETag / Last-Modified and revalidated
+      with If-None-Match / If-Modified-Since on the next run (304 -> disk copy)
+    - real network requests are spaced at least `min_interval` seconds apart, or
+      draw from `budget` (a rate shared with other processes) when one is given
+
+    `session` is a requests.Session (or anything with the same get()).
+    """
+
+    def __init__(self, session, cache_dir=None, min_interval=0.0, timeout=30, budget=None):
+        self.session = session
+        self.cache_dir = cache_dir
+        self.min_interval = min_interval
+        self.budget = budget
+        self.timeout = timeout
+        self._memo = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._pace_lock = threading.Lock()
+        self._last = 0.0
+        self._stats = {'memo': 0, 'fetched': 0, 'revalidated': 0}
+
+    def _paths(self, url):
+        h = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, h + '.json'), os.path.join(self.cache_dir, h + '.body')
+
+    def _load(self, url):
+        if not self.cache_dir:
+            return None, None
+        meta_p, body_p = self._paths(url)
+        try:
+            meta = json.load(open(meta_p))
+            with open(body_p, encoding='utf-8') as f:
+                return meta, f.read()
+        except Exception:
+            return None, None
+
+    def _store(self, url, headers, body):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_p, body_p = self._paths(url)
+        meta = {'url': url, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'), 'fetchedAt': time.time()}
+        # run shards share the cache dir and fetch overlapping peer pages: tmp names are per process/thread
+        tmp = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(body_p + tmp, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(body_p + tmp, body_p)
+        with open(meta_p + tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_p + tmp, meta_p)
+
+    def _pace(self):
+        if self.budget:
+            self.budget.acquire()
+            return
+        with self._pace_lock:
+            wait = self._last + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last = time.monotonic()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get(self, url):
+        with self._lock:
+            lock = self._locks.setdefault(url, threading.Lock())
+        with lock:
+            if url in self._memo:
+                self._count('memo')
+                return self._memo[url]
+            meta, body = self._load(url)
+            headers = {}
+            if meta and body is not None:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+            self._pace()
+            r = self.session.get(url, headers=headers, timeout=self.timeout)
+            if r.status_code == 304 and body is not None:
+                self._count('revalidated')
+            else:
+                r.raise_for_status()
+                body = r.text
+                self._store(url, r.headers, body)
+                self._count('fetched')
+            self._memo[url] = body
+            return body
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,222 @@
+import os, io, json, gzip, time, atexit, base64, hashlib, threading
+from http import client
+from urllib import parse, request, error
+
+# query parameters that change on every run (time windows, cache busters) and are left out of the match key
+VOLATILE_PARAMS = ('period1', 'period2', 'crumb', '_')
+
+
+class TapeMiss(LookupError):
+    pass
+
+
+def _headers(pairs):
+    h = client.HTTPMessage()
+    for k, v in pairs:
+        h[k] = v
+    return h
+
+
+class TapeResponse:
+    """A recorded response, shaped enough like http.client / urllib / requests responses for our callers."""
+
+    will_close = False
+
+    def __init__(self, url, status, reason, headers, data):
+        self.url = url
+        self.status = self.status_code = status
+        self.reason = reason
+        self.headers = _headers(headers)
+        self.content = data
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def read(self):
+        return self.content
+
+    def getheaders(self):
+        return list(self.headers.items())
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise error.HTTPError(self.url, self.status, self.reason, self.headers, io.BytesIO(self.content))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Tape:
+    """Record/replay of every HTTP exchange a research run makes.
+
+    - record: real requests go out as usual and each response (status, headers,
+      body, elapsed time) is appended to a gzip'd JSON-lines archive at `path`
+    - replay: nothing touches the network; responses are served from the archive,
+      after `latency` seconds (a number, or 'recorded' to reuse each response's
+      recorded duration)
+    - off: pass-through
+
+    Exchanges are matched on method + URL (minus VOLATILE_PARAMS). Repeated
+    requests to the same key are answered in recorded order, the last answer
+    repeating once they run out, so block listings re-read after a write still
+    replay as they were seen. Request bodies only feed the `body_mismatch` counter.
+
+    With `upstream` (http://host:port) the real requests of off/record mode go to
+    `{upstream}/{original host}{path}` instead, e.g. a local mock server.
+    """
+
+    def __init__(self, path=None, mode='off', latency=0.0, upstream=None):
+        if mode not in ('off', 'record', 'replay'):
+            raise ValueError(f'unknown tape mode {mode!r}')
+        if mode != 'off' and not path:
+            raise ValueError('tape path required')
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self._lock = threading.Lock()
+        self._entries = []
+        self._by_key = {}
+        self._cursor = {}
+        self._stats = {'recorded': 0, 'replayed': 0, 'missed': 0, 'body_mismatch': 0}
+        if mode == 'replay':
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    e = json.loads(line)
+                    self._by_key.setdefault((e['m'], e['k']), []).append(e)
+        elif mode == 'record':
+            atexit.register(self.save)
+
+    @classmethod
+    def from_env(cls):
+        """RESEARCH_HTTP_MODE=record|replay, RESEARCH_HTTP_TAPE=archive path, RESEARCH_HTTP_LATENCY=ms|recorded,
+        RESEARCH_HTTP_UPSTREAM=base URL real requests are sent to instead of their own host."""
+        lat = os.environ.get('RESEARCH_HTTP_LATENCY', '0')
+        return cls(os.environ.get('RESEARCH_HTTP_TAPE'), os.environ.get('RESEARCH_HTTP_MODE', 'off'), lat if lat == 'recorded' else float(lat) / 1000,
+                   os.environ.get('RESEARCH_HTTP_UPSTREAM'))
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def active(self):
+        return self.mode != 'off'
+
+    def target(self, url):
+        if not self.upstream:
+            return url
+        u = parse.urlsplit(url)
+        return parse.urlunsplit(('', '', f'{self.upstream}/{u.netloc}{u.path}', u.query, ''))
+
+    @staticmethod
+    def key(url):
+        u = parse.urlsplit(url)
+        q = [(k, v) for k, v in parse.parse_qsl(u.query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+        return parse.urlunsplit((u.scheme, u.netloc, u.path, parse.urlencode(q), ''))
+
+    @staticmethod
+    def _digest(body):
+        if body is None:
+            return None
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        return hashlib.sha1(body).hexdigest()
+
+    def record(self, method, url, body, status, reason, headers, data, elapsed):
+        e = {'m': method, 'k': self.key(url), 'u': url, 'b': self._digest(body), 's': status, 'r': reason,
+             'h': [[k, v] for k, v in headers], 't': round(elapsed, 4)}
+        try:
+            e['d'] = data.decode('utf-8')
+        except UnicodeDecodeError:
+            e['d64'] = base64.b64encode(data).decode('ascii')
+        with self._lock:
+            self._entries.append(e)
+            self._stats['recorded'] += 1
+
+    def replay(self, method, url, body=None):
+        k = (method, self.key(url))
+        with self._lock:
+            seq = self._by_key.get(k)
+            if not seq:
+                self._stats['missed'] += 1
+                raise TapeMiss(f'{method} {url} not on tape')
+            i = self._cursor.get(k, 0)
+            self._cursor[k] = i + 1
+            e = seq[min(i, len(seq) - 1)]
+            self._stats['replayed'] += 1
+            if e['b'] != self._digest(body):
+                self._stats['body_mismatch'] += 1
+        delay = e['t'] if self.latency == 'recorded' else self.latency
+        if delay:
+            time.sleep(delay)
+        data = e['d'].encode('utf-8') if 'd' in e else base64.b64decode(e['d64'])
+        return TapeResponse(url, e['s'], e['r'], e['h'], data)
+
+    def urlopen(self, req, timeout=None):
+        """urllib.request.urlopen through the tape (HTTPError for >= 400, as urlopen does)."""
+        method, url, body = req.get_method(), req.full_url, req.data
+        if self.replaying:
+            r = self.replay(method, url, body)
+            r.raise_for_status()
+            return r
+        if self.upstream:
+            req = request.Request(self.target(url), data=body, headers=dict(req.header_items()), method=method)
+        if not self.recording:
+            return request.urlopen(req, timeout=timeout)
+        t0 = time.perf_counter()
+        try:
+            with request.urlopen(req, timeout=timeout) as r:
+                data = r.read()
+                status, reason, headers = r.status, r.reason, r.headers.items()
+        except error.HTTPError as e:
+            data = e.read()
+            self.record(method, url, body, e.code, e.reason, e.headers.items(), data, time.perf_counter() - t0)
+            raise error.HTTPError(e.url, e.code, e.reason, e.headers, io.BytesIO(data))
+        self.record(method, url, body, status, reason, headers, data, time.perf_counter() - t0)
+        return TapeResponse(url, status, reason, headers, data)
+
+    def session(self, session):
+        return TapeSession(self, session)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, mode=self.mode)
+
+    def save(self):
+        if not self.recording:
+            return
+        with self._lock:
+            entries = list(self._entries)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            for e in entries:
+                f.write(json.dumps(e, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
+
+
+class TapeSession:
+    """requests.Session.get() through a Tape."""
+
+    def __init__(self, tape, session):
+        self.tape = tape
+        self.session = session
+        self.headers = session.headers
+
+    def get(self, url, **kw):
+        if self.tape.replaying:
+            return self.tape.replay('GET', url)
+        t0 = time.perf_counter()
+        r = self.session.get(self.tape.target(url), **kw)
+        if self.tape.recording:
+            self.tape.record('GET', url, None, r.status_code, r.reason, r.headers.items(), r.content, time.perf_counter() - t0)
+        return r
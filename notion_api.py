@@ -0,0 +1,440 @@
+import os, io, json, time, difflib, hashlib, threading, queue, select
+from concurrent.futures import ThreadPoolExecutor
+from http import client
+from urllib import parse, error
+from pacing import file_lock
+
+NOTION_VERSION = '2025-09-03'
+API_BASE = os.environ.get('NOTION_API_BASE', 'https://api.notion.com')
+RATE_PER_SEC = 3.0  # Notion's documented average limit per integration
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `pause()` drains it so every caller waits out a Retry-After."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.t = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+def idempotent(method, path):
+    # appending children / creating pages must not be replayed after an ambiguous failure
+    return method not in ('POST', 'PATCH') or (method == 'PATCH' and not path.rstrip('/').endswith('/children'))
+
+
+def block_text(b):
+    """Plain text of a block's rich_text, for both API responses and locally built blocks."""
+    body = b.get(b.get('type'))
+    if not isinstance(body, dict):
+        return ''
+    return ''.join(t.get('plain_text', (t.get('text') or {}).get('content', '')) for t in body.get('rich_text', []))
+
+
+def block_sig(b):
+    return b.get('type'), block_text(b)
+
+
+def diff_children(old, new):
+    """Edit script turning existing blocks `old` into locally built blocks `new`.
+
+    Returns [(op, ref, arg)] with op in keep/update/insert/archive, where `ref` is
+    the existing block id to update/archive or the sibling id to insert after.
+    Returns None when a run of inserts has no preceding surviving block.
+    """
+    sm = difflib.SequenceMatcher(None, [block_sig(b) for b in old], [block_sig(b) for b in new], autojunk=False)
+    plan, archives = [], []
+    anchor = None
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        olds, news = old[i1:i2], new[j1:j2]
+        if tag == 'equal':
+            plan += [('keep', b['id'], None) for b in olds]
+            anchor = olds[-1]['id']
+            continue
+        pending = []
+        for k, nb in enumerate(news):
+            ob = olds[k] if k < len(olds) else None
+            if ob is not None and ob.get('type') == nb['type']:
+                if pending:
+                    if anchor is None and old:
+                        return None
+                    plan.append(('insert', anchor, pending))
+                    pending = []
+                plan.append(('update', ob['id'], nb))
+                anchor = ob['id']
+            else:
+                if ob is not None:
+                    archives.append(ob['id'])
+                pending.append(nb)
+        if pending:
+            if anchor is None and old:
+                return None
+            plan.append(('insert', anchor, pending))
+        archives += [b['id'] for b in olds[len(news):]]
+    return plan + [('archive', bid, None) for bid in archives]
+
+
+class PageHashStore:
+    """Digests of the blocks last written to each page, persisted as JSON.
+
+    Blocks whose text starts with one of `volatile` (the update timestamp) are left
+    out, so a re-render of unchanged data hashes the same and the write can be
+    skipped. Section digests (split on heading_2) are kept for reporting.
+    """
+
+    def __init__(self, path, volatile=('업데이트 시각',)):
+        self.path = path
+        self.volatile = tuple(volatile)
+        self.data = {}
+        self._recorded = set()
+        if os.path.exists(path):
+            try:
+                self.data = json.load(open(path))
+            except Exception:
+                self.data = {}
+
+    def digest(self, blocks):
+        sections, cur = [], hashlib.sha256()
+        total = hashlib.sha256()
+        for b in blocks:
+            typ, txt = block_sig(b)
+            if txt.startswith(self.volatile):
+                continue
+            if typ == 'heading_2':
+                sections.append(cur.hexdigest())
+                cur = hashlib.sha256()
+            enc = json.dumps([typ, txt], ensure_ascii=False).encode('utf-8')
+            cur.update(enc)
+            total.update(enc)
+        sections.append(cur.hexdigest())
+        return total.hexdigest(), sections
+
+    def unchanged(self, page_id, blocks):
+        prev = self.data.get(page_id)
+        return bool(prev) and prev.get('digest') == self.digest(blocks)[0]
+
+    def changed_sections(self, page_id, blocks):
+        prev = (self.data.get(page_id) or {}).get('sections', [])
+        cur = self.digest(blocks)[1]
+        return [i for i, h in enumerate(cur) if i >= len(prev) or prev[i] != h]
+
+    def record(self, page_id, blocks, **extra):
+        digest, sections = self.digest(blocks)
+        self.data[page_id] = dict(extra, digest=digest, sections=sections, recordedAt=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        self._recorded.add(page_id)
+
+    def save(self):
+        # other processes (run shards) may have saved pages of their own since we loaded
+        with file_lock(self.path + '.lock'):
+            try:
+                disk = json.load(open(self.path))
+            except Exception:
+                disk = {}
+            self.data = dict(disk, **{k: self.data[k] for k in self._recorded})
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+
+def retry_after(headers, default):
+    try:
+        return max(0.0, float(headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return default
+
+
+class NotionClient:
+    """Notion REST client over a pool of persistent HTTP/1.1 keep-alive connections.
+
+    One instance is meant to be shared by every helper in a run (search, archive,
+    append ...) so the TCP/TLS handshake is paid once per pooled connection instead
+    of once per request. `base` can point at a local mock server (http://host:port).
+    Errors are raised as urllib.error.HTTPError so callers keep their existing
+    `except` / failure-reporting behaviour.
+
+    All calls share one token bucket (`rate` req/s, None disables it; `bucket`
+    replaces it, e.g. a pacing.SharedBudget for several processes). 429s are
+    retried up to `retries` times, as are 5xx responses and network errors for
+    idempotent calls, honouring Retry-After when present and backing off
+    exponentially otherwise. `on_throttle(retry_after)` is called for every 429 so
+    a run-level scheduler can slow down too.
+
+    With a `tape` (http_tape.Tape) every exchange is recorded, or served from the
+    archive instead of the network when it is replaying.
+    """
+
+    def __init__(self, key, base=None, version=NOTION_VERSION, timeout=60, pool_size=4, user_agent='Mozilla/5.0', rate=RATE_PER_SEC, retries=4, on_throttle=None, tape=None, bucket=None):
+        u = parse.urlsplit(base or API_BASE)
+        self.base = f'{u.scheme}://{u.netloc}'
+        self.scheme, self.host, self.port = u.scheme, u.hostname, u.port
+        self.timeout = timeout
+        self.headers = {
+            'Authorization': f'Bearer {key}',
+            'Notion-Version': version,
+            'Content-Type': 'application/json',
+            'User-Agent': user_agent,
+            'Connection': 'keep-alive',
+        }
+        self.bucket = bucket or (TokenBucket(rate) if rate else None)
+        self.retries = retries
+        self.on_throttle = on_throttle
+        self.tape = tape
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'errors': 0, 'retries': 0, 'throttled': 0, 'connects': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'by_method': {}}
+
+    def _connect(self):
+        cls = client.HTTPSConnection if self.scheme == 'https' else client.HTTPConnection
+        with self._lock:
+            self._stats['connects'] += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        """(connection, reused): an idle one when available, skipping any the server has visibly closed."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), False
+            # an idle keep-alive socket is readable only once the peer closed it (EOF) or sent junk
+            if conn.sock is not None and not select.select([conn.sock], [], [], 0)[0]:
+                return conn, True
+            conn.close()
+
+    def _checkin(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _record(self, method, elapsed, ok):
+        with self._lock:
+            s = self._stats
+            s['calls'] += 1
+            s['seconds'] += elapsed
+            s['max_seconds'] = max(s['max_seconds'], elapsed)
+            if not ok:
+                s['errors'] += 1
+            m = s['by_method'].setdefault(method, {'calls': 0, 'seconds': 0.0})
+            m['calls'] += 1
+            m['seconds'] += elapsed
+
+    def _send(self, method, path, body):
+        if self.tape and self.tape.replaying:
+            r = self.tape.replay(method, self.base + path, body)
+            return r, r.content
+        t0 = time.perf_counter()
+        r, data = self._send_pooled(method, path, body)
+        if self.tape and self.tape.recording:
+            self.tape.record(method, self.base + path, body, r.status, r.reason, r.getheaders(), data, time.perf_counter() - t0)
+        return r, data
+
+    def _send_pooled(self, method, path, body):
+        # A pooled connection may have been closed by the server while idle; that only
+        # surfaces on use. Resending on a fresh connection is safe when the failure came
+        # before the request was fully sent on a reused connection (the server never
+        # read it), or when the request is idempotent. A failure while reading the
+        # response of an append / page create is ambiguous and is never replayed.
+        safe = idempotent(method, path)
+        for attempt in (0, 1):
+            conn, reused = self._checkout() if attempt == 0 else (self._connect(), False)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=self.headers)
+                sent = True
+                r = conn.getresponse()
+                data = r.read()
+            except (client.RemoteDisconnected, client.CannotSendRequest, client.BadStatusLine, ConnectionError):
+                conn.close()
+                if attempt or not (safe or reused and not sent):
+                    raise
+                continue
+            except BaseException:
+                # timeouts and other socket errors: drop the connection instead of leaking it
+                conn.close()
+                raise
+            if r.will_close:
+                conn.close()
+            else:
+                self._checkin(conn)
+            return r, data
+
+    def _request_once(self, method, path, body):
+        if self.bucket:
+            self.bucket.acquire()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            r, data = self._send(method, path, body)
+            if r.status >= 400:
+                raise error.HTTPError(self.base + path, r.status, r.reason, r.headers, io.BytesIO(data))
+            ok = True
+            return json.loads(data.decode('utf-8')) if data else {}
+        finally:
+            self._record(method, time.perf_counter() - t0, ok)
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        safe = idempotent(method, path)
+        for attempt in range(self.retries + 1):
+            backoff = min(30.0, 0.5 * 2 ** attempt)
+            try:
+                return self._request_once(method, path, body)
+            except error.HTTPError as e:
+                if e.code not in RETRY_STATUS or attempt == self.retries or (e.code != 429 and not safe):
+                    raise
+                wait = retry_after(e.headers, backoff)
+                if e.code == 429:
+                    self._count('throttled')
+                    if self.on_throttle:
+                        self.on_throttle(wait)
+                    if self.bucket:
+                        # the drained bucket makes this and every other caller wait
+                        self.bucket.pause(wait)
+                        wait = 0
+            except (OSError, client.HTTPException):
+                if attempt == self.retries or not safe:
+                    raise
+                wait = backoff
+            self._count('retries')
+            time.sleep(wait)
+
+    def paginate(self, method, path, payload=None, page_size=100, prefetch=False):
+        """Yield result items across all pages, following has_more/next_cursor lazily.
+
+        GET endpoints take the cursor as a query parameter, POST endpoints (search,
+        database query) in the body. With prefetch=True the next page is requested
+        in the background while the caller consumes the current one.
+        """
+        def fetch(cursor):
+            if method == 'GET':
+                q = {'page_size': page_size}
+                if cursor:
+                    q['start_cursor'] = cursor
+                sep = '&' if '?' in path else '?'
+                return self.request('GET', path + sep + parse.urlencode(q))
+            body = dict(payload or {}, page_size=page_size)
+            if cursor:
+                body['start_cursor'] = cursor
+            return self.request(method, path, body)
+
+        ex = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            res = fetch(None)
+            while True:
+                cursor = res.get('next_cursor') if res.get('has_more') else None
+                nxt = ex.submit(fetch, cursor) if (ex and cursor) else None
+                yield from res.get('results', [])
+                if not cursor:
+                    return
+                res = nxt.result() if nxt else fetch(cursor)
+        finally:
+            if ex:
+                ex.shutdown(wait=False, cancel_futures=True)
+
+    def iter_children(self, block_id, prefetch=False):
+        return self.paginate('GET', f'/v1/blocks/{block_id}/children', prefetch=prefetch)
+
+    def archive_blocks(self, block_ids, workers=3):
+        """Archive blocks concurrently (still paced by the shared bucket).
+
+        Returns [(block_id, 'ErrType:message'), ...] for blocks that could not be archived.
+        """
+        def one(bid):
+            try:
+                self.request('PATCH', f'/v1/blocks/{bid}', {'archived': True})
+            except Exception as e:
+                return bid, f'{type(e).__name__}:{e}'
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return [r for r in ex.map(one, block_ids) if r]
+
+    def append_children(self, block_id, blocks, after=None, chunk=80):
+        """Append blocks (optionally after a sibling) in chunks; returns the created blocks."""
+        created = []
+        for i in range(0, len(blocks), chunk):
+            payload = {'children': blocks[i:i + chunk]}
+            if after:
+                payload['after'] = after
+            res = self.request('PATCH', f'/v1/blocks/{block_id}/children', payload)
+            new = res.get('results', [])
+            created += new
+            if after and new:
+                after = new[-1]['id']
+        return created
+
+    def sync_children(self, block_id, blocks, workers=3):
+        """Make a block's top-level children match `blocks` with a minimal set of edits.
+
+        The existing children are diffed against `blocks` on (type, plain text).
+        Changed blocks of the same type are PATCHed in place, new ones are inserted
+        after their predecessor, and removed ones are archived last, so the page is
+        never left empty mid-update. Meant for flat text blocks (paragraph/heading);
+        nested children of changed blocks are not compared.
+
+        Returns edit counters plus `archive_failed` in the same shape as archive_blocks.
+        """
+        old = list(self.iter_children(block_id))
+        plan = diff_children(old, blocks)
+        out = {'kept': 0, 'updated': 0, 'inserted': 0, 'archived': 0, 'archive_failed': []}
+        if plan is None:
+            # Notion can only insert after an existing sibling, so a leading insert
+            # ahead of every surviving block means append-all then archive-all.
+            plan = [('insert', None, blocks)] + [('archive', b['id'], None) for b in old]
+        to_archive = []
+        for op, ref, arg in plan:
+            if op == 'keep':
+                out['kept'] += 1
+            elif op == 'update':
+                t = arg['type']
+                self.request('PATCH', f'/v1/blocks/{ref}', {t: {'rich_text': arg[t].get('rich_text', [])}})
+                out['updated'] += 1
+            elif op == 'insert':
+                self.append_children(block_id, arg, after=ref)
+                out['inserted'] += len(arg)
+            else:
+                to_archive.append(ref)
+        if to_archive:
+            out['archive_failed'] = self.archive_blocks(to_archive, workers=workers)
+            out['archived'] = len(to_archive) - len(out['archive_failed'])
+        return out
+
+    def stats(self):
+        with self._lock:
+            s = json.loads(json.dumps(self._stats))
+        s['avg_ms'] = round(s['seconds'] * 1000 / s['calls'], 1) if s['calls'] else None
+        return s
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,116 @@
+import os, time, fcntl, threading, contextlib
+
+
+class AdaptivePacer:
+    """Spacing between units of work driven by observed pressure instead of a fixed sleep.
+
+    - throttle(retry_after): a 429 doubles the backoff (at least `step`, at least Retry-After)
+    - ok(): a unit finished without any 429, so the backoff halves back toward zero
+      (the caller skips it for units that saw throttle(), or the backoff would never hold)
+    - usage(pct): above `soft_usage` the interval rises linearly to `max_interval` at `hard_usage`
+
+    The effective interval is never below `min_interval` nor above `max_interval`.
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=900.0, step=5.0, soft_usage=50.0, hard_usage=75.0, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.step = float(step)
+        self.soft_usage = float(soft_usage)
+        self.hard_usage = float(hard_usage)
+        self.clock = clock
+        self.sleep = sleep
+        self._backoff = 0.0
+        self._usage_floor = 0.0
+        self._last = None
+        self._lock = threading.Lock()
+        self.events = {'throttled': 0, 'waited_seconds': 0.0}
+
+    @property
+    def interval(self):
+        with self._lock:
+            return min(self.max_interval, max(self.min_interval, self._backoff, self._usage_floor))
+
+    def throttle(self, retry_after=None):
+        with self._lock:
+            self.events['throttled'] += 1
+            self._backoff = min(self.max_interval, max(self._backoff * 2, self.step, retry_after or 0.0))
+
+    def ok(self):
+        with self._lock:
+            self._backoff = self._backoff / 2 if self._backoff > self.step else 0.0
+
+    def usage(self, pct):
+        if pct is None:
+            return
+        span = max(1e-9, self.hard_usage - self.soft_usage)
+        frac = min(1.0, max(0.0, (float(pct) - self.soft_usage) / span))
+        with self._lock:
+            self._usage_floor = frac * self.max_interval
+
+    def wait(self):
+        """Sleep until `interval` has passed since the last done()."""
+        if self._last is None:
+            return 0.0
+        remaining = self._last + self.interval - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+            self.events['waited_seconds'] += remaining
+            return remaining
+        return 0.0
+
+    def done(self):
+        self._last = self.clock()
+
+    def snapshot(self):
+        return dict(self.events, interval=round(self.interval, 1), backoff=round(self._backoff, 1), usage_floor=round(self._usage_floor, 1))
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on `path` (created if missing), held across processes."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedBudget:
+    """Token bucket kept in a file, so every process on the host using `path` draws from one rate.
+
+    Same interface as notion_api.TokenBucket: acquire() blocks for a token,
+    pause(seconds) drains the bucket so all sharers wait out a Retry-After.
+    """
+
+    def __init__(self, path, rate, burst=None):
+        self.path = path
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+
+    def _update(self, take):
+        with file_lock(self.path) as f:
+            f.seek(0)
+            now = time.time()
+            try:
+                tokens, t = map(float, f.read().split())
+            except ValueError:
+                tokens, t = self.capacity, now
+            tokens, out = take(min(self.capacity, tokens + max(0.0, now - t) * self.rate))
+            f.seek(0)
+            f.truncate()
+            f.write(f'{tokens} {now}')
+            f.flush()
+            return out
+
+    def acquire(self):
+        while True:
+            wait = self._update(lambda tokens: (tokens - 1, 0.0) if tokens >= 1 else (tokens, (1 - tokens) / self.rate))
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        self._update(lambda tokens: (min(tokens, 1 - seconds * self.rate), None))
@@ -0,0 +1,528 @@
+import os, json, time, hashlib, datetime, traceback, threading, queue, tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from notion_api import RATE_PER_SEC, NotionClient, PageHashStore
+from http_tape import Tape
+from pacing import AdaptivePacer, SharedBudget
+from checkpoint import Checkpoint
+from fundamentals_store import FundamentalsStore
+from research_metrics import Frame
+from research_providers import PEER_FIELDS, StockAnalysisProvider, YahooProvider
+
+NOTION_KEY = open(os.path.expanduser('~/.config/notion/api_key')).read().strip()
+NOTION_VERSION = '2025-09-03'
+ROOT_RESEARCH_PAGE = '312bd3c5-5e1b-80d6-be49-e2b6fbbcbc41'
+UA = 'Mozilla/5.0'
+# RESEARCH_HTTP_MODE=record|replay: every HTTP exchange goes through the tape; state files then live in a
+# scratch workspace so a recorded run and its replays take the same path (no hash/checkpoint skips)
+TAPE = Tape.from_env()
+WORKSPACE = os.environ.get('RESEARCH_WORKSPACE') or (tempfile.mkdtemp(prefix='research-tape-') if TAPE.active else '/home/soyu/.openclaw/workspace')
+
+# processes of one sharded run share a rate budget per service: token buckets kept in this directory
+BUDGET_DIR = os.environ.get('RESEARCH_BUDGET_DIR')
+
+
+def budget(name, rate):
+    return SharedBudget(f'{BUDGET_DIR}/{name}.bucket', rate) if BUDGET_DIR and rate and not TAPE.replaying else None
+
+
+# Inter-ticker spacing adapts to 429s / Retry-After and codexbar usage (replaces the fixed 900s sleep)
+PACER = AdaptivePacer(min_interval=float(os.environ.get('RESEARCH_MIN_INTERVAL', '0')), max_interval=float(os.environ.get('RESEARCH_MAX_INTERVAL', '900')))
+NOTION = NotionClient(NOTION_KEY, version=NOTION_VERSION, user_agent=UA, on_throttle=PACER.throttle, tape=TAPE, rate=None if TAPE.replaying else RATE_PER_SEC,
+                      bucket=budget('notion', RATE_PER_SEC))
+PAGE_HASHES = PageHashStore(f'{WORKSPACE}/memory/research-page-hashes.json')
+TOUCH_UNCHANGED = os.environ.get('RESEARCH_TOUCH_UNCHANGED') == '1'
+RESUME_MAX_AGE = float(os.environ.get('RESEARCH_RESUME_HOURS', '20')) * 3600
+# annual rows live here; a ticker is only asked for new periods once its stored rows are this old
+FUNDAMENTALS = FundamentalsStore(f'{WORKSPACE}/memory/fundamentals.col')
+FUNDAMENTALS_TTL = float(os.environ.get('RESEARCH_FUNDAMENTALS_HOURS', '24')) * 3600
+
+UNIVERSE = os.environ.get('RESEARCH_UNIVERSE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'research_universe.json')
+
+
+def load_universe(path):
+    """{"targets": [...], "peers": {ticker: [...]}, "styles": {ticker: label}} -> (targets, peer_group, style_map)"""
+    with open(path, encoding='utf-8') as f:
+        u = json.load(f)
+    return u['targets'], u.get('peers', {}), u.get('styles', {})
+
+
+TARGETS, PEER_GROUP, STYLE_MAP = load_universe(UNIVERSE)
+
+FETCH_WORKERS = int(os.environ.get('RESEARCH_FETCH_WORKERS', '4'))
+FETCH_DEPTH = int(os.environ.get('RESEARCH_FETCH_DEPTH', '0'))  # 0 = prefetch every target up front
+# provider calls for one symbol run side by side on this pool (separate from the prefetch pool)
+_FANOUT = ThreadPoolExecutor(max_workers=int(os.environ.get('RESEARCH_PROVIDER_WORKERS', '8')))
+# the next provider is fired after this long without an answer; per-symbol wait once something has answered
+HEDGE_AFTER = float(os.environ.get('RESEARCH_HEDGE_MS', '1500')) / 1000
+COLLECT_DEADLINE = float(os.environ.get('RESEARCH_COLLECT_DEADLINE', '15')) or None
+# fields the primary provider never supplies are not a hedge trigger; the ones listed here are asked from
+# the providers that can supply them, in parallel with the primary (targets / peer rows)
+ENRICH_FIELDS = tuple(f for f in os.environ.get('RESEARCH_ENRICH', 'description,consensus,rev_growth_5y').split(',') if f)
+PEER_ENRICH_FIELDS = tuple(f for f in os.environ.get('RESEARCH_PEER_ENRICH', '').split(',') if f)
+_collect_stats = {'calls': 0, 'enriched': 0, 'hedged_slow': 0, 'hedged_missing': 0, 'hedged_error': 0, 'deadline': 0}
+_collect_lock = threading.Lock()
+
+
+def make_providers(names):
+    """Providers in priority order from names: yahoo, stockanalysis."""
+    out = []
+    for n in names:
+        if n == 'yahoo':
+            ttl = float(os.environ.get('YAHOO_QUOTE_CACHE_TTL', '0'))
+            # the prefetch workers x provider fan-out would otherwise hit Yahoo unpaced; shards share one budget
+            rate = None if TAPE.replaying else float(os.environ.get('YAHOO_RATE', '2')) or None
+            # Yahoo 429s are waited out inside the provider; they do not touch the Notion write pacer
+            out.append(YahooProvider(TAPE, user_agent=UA, cache_path=f'{WORKSPACE}/memory/yahoo-quote-cache.json', cache_ttl=ttl,
+                                     store=FUNDAMENTALS, store_ttl=FUNDAMENTALS_TTL,
+                                     rate=rate, bucket=budget('yahoo', rate), max_concurrent=int(os.environ.get('YAHOO_CONCURRENCY', '2')) or None))
+        elif n == 'stockanalysis':
+            # (no disk cache under a tape: the archive must hold full 200 bodies, not 304s)
+            out.append(StockAnalysisProvider(TAPE, cache_dir=None if TAPE.active else f'{WORKSPACE}/memory/http-cache/stockanalysis',
+                                             min_interval=0 if TAPE.replaying else 0.3, budget=budget('stockanalysis', 1 / 0.3)))
+        else:
+            raise ValueError(f'unknown provider {n!r}')
+    return out
+
+
+def _present(v):
+    return v is not None and v != '' and v != []
+
+
+def merge(answers):
+    """Per-field merge of [(provider_name, record)] in priority order -> (record, {field: provider_name})."""
+    rec, src = {}, {}
+    for name, ans in answers:
+        for k, v in ans.items():
+            if k not in rec and _present(v):
+                rec[k], src[k] = v, name
+    return rec, src
+
+
+def _count(key):
+    with _collect_lock:
+        _collect_stats[key] += 1
+
+
+def collect(ticker, providers, peer=False, hedge=HEDGE_AFTER, deadline=COLLECT_DEADLINE, enrich=None):
+    """Hedged per-field fetch of `ticker` from `providers` (priority order).
+
+    The first provider is asked alone, together with any later provider that
+    can supply an `enrich` field the first one does not declare (default
+    ENRICH_FIELDS / PEER_ENRICH_FIELDS). The next remaining provider is fired
+    in parallel when the requests in flight have not answered within `hedge`
+    seconds, or as soon as an answer fails or leaves fields the first provider
+    declares missing. Answers are merged per field (higher priority wins among
+    those received) and returned once the first provider's fields and the
+    enrichment fields are filled, every provider asked has answered, or
+    `deadline` seconds have passed with at least one answer in hand. A provider
+    error only counts as an empty answer; if every provider fails the first
+    error is raised.
+    """
+    def declared(p):
+        return set(p.peer_fields if peer else p.fields)
+
+    primary = declared(providers[0])
+    extra = set(PEER_ENRICH_FIELDS if peer else ENRICH_FIELDS) if enrich is None else set(enrich)
+    extra -= primary
+    enrichers = [p for p in providers[1:] if declared(p) & extra]
+    rest = [p for p in providers[1:] if p not in enrichers]
+    wanted = primary | extra & set().union(*map(declared, enrichers))
+    futs, seen = {}, set()
+    answers, errors = {}, []
+    rec, src = {}, {}
+    t0 = time.monotonic()
+
+    def launch(p, reason=None):
+        futs[_FANOUT.submit(p.fetch_peer if peer else p.fetch, ticker)] = p
+        if reason:
+            _count(reason)
+        return time.monotonic()
+
+    _count('calls')
+    launched_at = launch(providers[0])
+    for p in enrichers:
+        launch(p, 'enriched')
+    try:
+        while True:
+            pending = set(futs) - seen
+            if not pending:
+                if not rest or primary <= set(src):
+                    break
+                launched_at = launch(rest.pop(0), 'hedged_missing')
+                continue
+            timeouts = []
+            slow = rest and hedge is not None and not primary <= set(src)
+            if slow:
+                timeouts.append(launched_at + hedge - time.monotonic())
+            if deadline and answers:
+                timeouts.append(t0 + deadline - time.monotonic())
+            done, _ = wait(pending, timeout=max(0.0, min(timeouts)) if timeouts else None, return_when=FIRST_COMPLETED)
+            if not done:
+                if deadline and answers and time.monotonic() - t0 >= deadline:
+                    _count('deadline')
+                    break
+                if slow and time.monotonic() >= launched_at + hedge:
+                    launched_at = launch(rest.pop(0), 'hedged_slow')
+                continue
+            failed = False
+            seen |= done
+            for f in done:
+                try:
+                    answers[futs[f].name] = f.result()
+                except Exception as e:
+                    errors.append(e)
+                    failed = True
+            rec, src = merge([(q.name, answers[q.name]) for q in providers if q.name in answers])
+            if wanted <= set(src):
+                break
+            if rest and (failed or not primary <= set(src)):
+                launched_at = launch(rest.pop(0), 'hedged_error' if failed else 'hedged_missing')
+    finally:
+        for f in futs:
+            f.cancel()
+    if not answers and errors:
+        raise errors[0]
+    return rec, src
+
+
+def fetch_data(ticker, providers):
+    info, sources = collect(ticker, providers)
+    if info.get('rows'):
+        # rows from a store-backed provider are already in the store; upserting them again would mark it fresh
+        if not any(p.name == sources.get('rows') and getattr(p, 'store', None) is FUNDAMENTALS for p in providers):
+            FUNDAMENTALS.upsert(ticker, info['rows'], sources.get('rows'))
+        info['rows'] = FUNDAMENTALS.history(ticker, 5)
+    peers = {ticker: {k: info.get(k) for k in PEER_FIELDS}}
+    for tk in PEER_GROUP.get(ticker, []):
+        try:
+            peers[tk] = collect(tk, providers, peer=True)[0]
+        except Exception as e:
+            # one peer nobody could serve must not sink the report: its row renders as N/A
+            print('PEER_FAILED', ticker, tk, f'{type(e).__name__}:{e}', flush=True)
+            peers[tk] = {}
+    used = set(sources.values())
+    links = [l.format(tk=ticker, lower=ticker.lower()) for p in providers if p.name in used for l in p.links]
+    return {'info': info, 'peers': peers, 'sources': sources, 'links': links}
+
+
+def prefetch(tickers, providers, workers=FETCH_WORKERS, depth=FETCH_DEPTH):
+    """Fetch stage: run fetch_data for `tickers` on a thread pool, yielding
+    (ticker, data, error) in input order. At most `depth` fetched-but-unconsumed
+    tickers are held, so a slow writer applies back-pressure."""
+    depth = depth or len(tickers) or 1
+    slots = threading.Semaphore(depth)
+    q = queue.Queue()
+    ex = ThreadPoolExecutor(max_workers=workers)
+    stop = threading.Event()
+
+    def feed():
+        for tk in tickers:
+            slots.acquire()
+            if stop.is_set():
+                return
+            try:
+                q.put((tk, ex.submit(fetch_data, tk, providers)))
+            except RuntimeError:  # consumer closed the stage and the pool is shut down
+                return
+        q.put(None)
+    threading.Thread(target=feed, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            tk, fut = item
+            try:
+                data, err = fut.result(), None
+            except Exception as e:
+                data, err = None, e
+            slots.release()
+            yield tk, data, err
+    finally:
+        stop.set()
+        slots.release()
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def search_pages_under_research(targets):
+    out = {}
+    for b in NOTION.iter_children(ROOT_RESEARCH_PAGE, prefetch=True):
+        if b.get('type') == 'child_page':
+            title = b['child_page'].get('title', '')
+            tkr = title.split(' ')[0].strip()
+            if tkr in targets:
+                out[tkr] = {'id': b['id'], 'title': title}
+    return out
+
+
+def chunk_text(s, n=1800):
+    s = s or ''
+    return [s[i:i + n] for i in range(0, len(s), n)] or ['']
+
+
+def rich_text(text):
+    return [{"type": "text", "text": {"content": t}} for t in chunk_text(text)]
+
+
+def fmt_num(v, pct=False):
+    if v is None:
+        return 'N/A'
+    try:
+        v = float(v)
+        if pct:
+            return f"{v * 100:.1f}%"
+        av = abs(v)
+        if av >= 1e12: return f"{v / 1e12:.2f}T"
+        if av >= 1e9: return f"{v / 1e9:.2f}B"
+        if av >= 1e6: return f"{v / 1e6:.2f}M"
+        return f"{v:,.2f}"
+    except Exception:
+        return str(v)
+
+
+def fmt_int(v):
+    try:
+        return f"{int(v):,}"
+    except (TypeError, ValueError):
+        return 'N/A'
+
+
+def build_content(ticker, data, frame=None):
+    info, ps = data['info'], data['peers']
+    g = info.get
+    fm = frame or Frame.for_report(ticker, data)
+    m = fm.row(ticker)
+    margins = dict(fm.history(ticker))
+
+    lines = []
+    lines.append(('h2', '1) 회사 개요'))
+    lines.append(('p', f"[사실] {g('name') or ticker}({ticker})는 {g('sector') or 'N/A'}/{g('industry') or 'N/A'} 업종이며, 시가총액은 {fmt_num(g('market_cap'))} {g('currency') or 'USD'}, 상시 인력은 {fmt_int(g('employees'))}명, 최근 주가는 {fmt_num(g('price'))}입니다."))
+    if g('description'):
+        lines.append(('p', f"[사실] 사업 설명(요약): {g('description')[:450]}"))
+    lines.append(('p', f"[해석] {ticker}는 '{STYLE_MAP.get(ticker, '멀티팩터')}' 특성이 강해 실적 모멘텀 변화가 밸류에이션보다 주가 방향성을 좌우할 가능성이 큽니다."))
+
+    lines.append(('h2', '2) 매출 구성(사업부/지역/제품)'))
+    lines.append(('p', '[사실] 무료 공개 소스(Yahoo API, StockAnalysis 요약)에서는 사업부/지역/제품별 매출 비중을 일관된 구조로 제공하지 않습니다.'))
+    lines.append(('p', '[한계] 세부 매출 믹스는 최근 10-K/10-Q Segment note 및 IR 자료 수동 검증이 필요합니다.'))
+
+    lines.append(('h2', '3) 최근 5년 수익성(매출, 영업이익, 순이익, FCF)'))
+    if g('rows'):
+        for y, rev, opi, ni, f in g('rows'):
+            mg = margins.get(int(str(y)[:4]), {})
+            lines.append(('p', f"[사실][FY{y}] 매출 {fmt_num(rev)}, 영업이익 {fmt_num(opi)}, 순이익 {fmt_num(ni)}, FCF {fmt_num(f)} (영업이익률 {fmt_num(mg.get('op_margin'), pct=True)}, 순이익률 {fmt_num(mg.get('net_margin'), pct=True)}, FCF 마진 {fmt_num(mg.get('fcf_margin'), pct=True)})"))
+        lines.append(('p', f"[사실] 매출 성장: 최근 1년 {fmt_num(m['rev_yoy'], pct=True)}, 연평균(CAGR) {fmt_num(m['rev_cagr'], pct=True)}"))
+    else:
+        lines.append(('p', '[한계] 최근 5년 시계열 데이터를 충분히 확보하지 못했습니다.'))
+    lines.append(('p', '[해석] 영업이익률 유지 여부와 FCF의 추세 일치가 이익의 질을 판별하는 핵심입니다.'))
+
+    lines.append(('h2', '4) 투자지표(PER, ROE, EPS, 부채비율 + EV/EBITDA, FCF Yield 등)'))
+    lines.append(('p', f"[사실] PER {fmt_num(g('pe'))}, Forward PER {fmt_num(g('fpe'))}, ROE {fmt_num(g('roe'), pct=True)}, EPS {fmt_num(g('eps'))}, 부채비율(D/E) {fmt_num(g('de'))}, EV/EBITDA {fmt_num(g('ev_ebitda'))}, FCF Yield {fmt_num(m['fcf_yield'], pct=True)}"))
+    lines.append(('p', '[해석] 멀티플의 고저보다 이익 추정치(컨센서스) 상향/하향 전환 시점이 기대수익률에 더 결정적입니다.'))
+
+    lines.append(('h2', '5) 경쟁사 비교(밸류·성장·마진·점유율)'))
+    for tk in ps:
+        p = fm.row(tk)
+        lines.append(('p', f"[사실] {tk}: PER {fmt_num(p['pe'])}, Forward PER {fmt_num(p['fpe'])}, 매출성장률 {fmt_num(p['rev_growth'], pct=True)}, 5Y 매출성장 전망 {fmt_num(p['rev_growth_5y'], pct=True)}, 영업마진 {fmt_num(p['op_margin'], pct=True)}, FCF Yield {fmt_num(p['fcf_yield'], pct=True)}, 시총 {fmt_num(p['market_cap'])}"))
+    rank = [f"{label} {fmt_num(m[f + '_pct'], pct=True)}(z {fmt_num(m[f + '_z'])})" for f, label in
+            (('pe', 'PER'), ('rev_growth', '매출성장률'), ('op_margin', '영업마진'), ('fcf_yield', 'FCF Yield')) if m[f + '_pct'] is not None]
+    if rank:
+        lines.append(('p', f"[사실] 피어 그룹 내 {ticker} 백분위(0%=최저, 100%=최고): " + ', '.join(rank)))
+    lines.append(('p', '[한계] 산업 점유율은 외부 산업리포트(유료 포함) 의존도가 높아 본 자동 수집 범위에서는 제외했습니다.'))
+
+    lines.append(('h2', '6) 애널리스트/기관 의견(목표가 변경, 레이팅 추세)'))
+    lines.append(('p', f"[사실] 커버 애널리스트 {fmt_int(g('n_analyst'))}명, 컨센서스 {g('consensus') or g('recommendation') or 'N/A'}, 추천평균 {fmt_num(g('recommendation_mean'))}, 목표가 평균/고가/저가 {fmt_num(g('target_mean'))}/{fmt_num(g('target_high'))}/{fmt_num(g('target_low'))}, 현재가 {fmt_num(g('price'))}"))
+    lines.append(('p', '[해석] 목표가 하향이 연속되는 구간에서는 밸류 정당화보다 이익 하향 리스크 관리가 우선입니다.'))
+
+    lines.append(('h2', '7) 어닝콜 핵심 코멘트(가이던스, 리스크, 모멘텀)'))
+    lines.append(('p', '[사실] 무료 구조화 소스에서 어닝콜 원문/가이던스 문장 단위 데이터는 제한적입니다.'))
+    lines.append(('p', '[해석] 다음 콜에서는 (1) 가이던스 방향 (2) 재고/주문 추세 (3) 원가·환율 영향 코멘트 3가지를 우선 점검해야 합니다.'))
+
+    lines.append(('h2', '8) 리스크 체크리스트(규제, 사이클, 수요, 원가, 지정학)'))
+    lines.append(('p', f"[사실] {ticker}는 업종 특성상 경기/수요 사이클, 원가, 금리·환율, 지정학 이벤트에 실적 민감도가 존재합니다."))
+    lines.append(('p', '[해석] 리스크 점검 순서: 규제/소송 → 수요 둔화 → 원가상승 → 자금조달비용 → 지정학 공급망 이슈.'))
+
+    lines.append(('h2', '9) 투자 관점 요약(불/중립/약세 시나리오)'))
+    lines.append(('p', f"[불] {ticker}: 매출 성장률 반등과 마진 개선이 동반되면 컨센서스 상향과 함께 리레이팅 가능."))
+    lines.append(('p', f"[중립] {ticker}: 성장 둔화와 비용 통제가 균형이면 멀티플 박스권 내 등락 가능."))
+    lines.append(('p', f"[약세] {ticker}: 가이던스 하향+마진 훼손이 겹치면 이익 추정치 하향과 변동성 확대 가능."))
+
+    lines.append(('h2', '10) 참고 출처 링크'))
+    links = list(data['links'])
+    if g('website'):
+        links.append(g('website'))
+    for l in links:
+        lines.append(('p', l))
+    counts = {}
+    for s in data['sources'].values():
+        counts[s] = counts.get(s, 0) + 1
+    if fm.derived['fcf_yield'][fm.index[ticker]]:
+        counts['derived'] = counts.get('derived', 0) + 1
+    lines.append(('p', '[출처] 항목별 제공원: ' + ', '.join(f'{k} {v}개' for k, v in sorted(counts.items()))))
+    return lines
+
+
+def to_notion_blocks(lines):
+    out = []
+    stamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    out.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text(f"업데이트 시각(KST): {stamp}")}})
+    out.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text("작성 원칙: [사실]은 데이터 기반, [해석]은 분석 의견입니다.")}})
+    for typ, txt in lines:
+        if typ == 'h2':
+            out.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": rich_text(txt)}})
+        else:
+            out.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text(txt)}})
+    return out
+
+
+def check_usage_and_maybe_stop(done_count):
+    usage = None
+    if TAPE.replaying:
+        return False, usage
+    try:
+        import subprocess, re
+        p = subprocess.run(['codexbar', 'cost', '--provider', 'codex', '--format', 'json'], capture_output=True, text=True, timeout=20)
+        if p.returncode == 0:
+            m = re.search(r'"dailyUsagePercent"\s*:\s*([0-9.]+)', p.stdout)
+            if m: usage = float(m.group(1))
+    except Exception:
+        pass
+    if usage is not None and usage > 75:
+        title = f'사용량 임계치 초과 중단 ({datetime.date.today().isoformat()})'
+        pg = NOTION.request('POST', '/v1/pages', {'parent': {'page_id': ROOT_RESEARCH_PAGE}, 'properties': {'title': {'title': [{'type': 'text', 'text': {'content': title}}]}}})
+        NOTION.append_children(pg['id'], [
+            {"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"type": "text", "text": {"content": "중단 사유"}}]}},
+            {"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": f"일일 사용량 {usage:.1f}%로 75% 초과. {done_count}개 완료 후 중단."}}]}},
+        ])
+        return True, usage
+    return False, usage
+
+
+def shard(tickers, index, count):
+    """The `index`-th of `count` hash shards of `tickers` (sha1, so every process and host agrees)."""
+    return [tk for tk in tickers if int(hashlib.sha1(tk.encode('utf-8')).hexdigest(), 16) % count == index]
+
+
+# per-shard figures that are levels rather than counts
+_MAX_KEYS = ('max_seconds', 'interval', 'backoff', 'usage_floor', 'tickers', 'rows', 'timestamp')
+
+
+def _merge(a, b, key=None):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return {k: _merge(a[k], b[k], k) if k in a and k in b else a.get(k, b.get(k)) for k in {**a, **b}}
+    if isinstance(a, list) and isinstance(b, list):
+        return a + b
+    if isinstance(a, bool) or isinstance(b, bool):
+        return bool(a or b)
+    if key in _MAX_KEYS:
+        return max(a, b)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a + b
+    return b
+
+
+def merge_results(parts):
+    """One report from the result dicts of run() shards: lists concatenated, counts summed, levels maxed."""
+    out = {}
+    for p in parts:
+        out = _merge(out, p) if out else dict(p)
+    ns = out.get('notion_stats') or {}
+    if ns.get('calls'):
+        ns['avg_ms'] = round(ns['seconds'] / ns['calls'] * 1000, 1)
+    out['shards'] = len(parts)
+    return out
+
+
+def run(providers, result_name, targets=TARGETS, checkpoint_name=None):
+    """Refresh the research page of every ticker in `targets` from `providers` (priority order).
+
+    Writes `{WORKSPACE}/{result_name}.json` and returns the same result dict.
+    """
+    checkpoint = Checkpoint(f"{WORKSPACE}/memory/{checkpoint_name or result_name + '-checkpoint'}.jsonl", max_age=RESUME_MAX_AGE)
+    mapping = search_pages_under_research(targets)
+    updated = []; unchanged = []; failed = []; archive_failed = {}
+    datas = {}
+
+    failed += [(tk, 'page_not_found') for tk in targets if tk not in mapping]
+    # resume from the checkpoint journal: recently written tickers are skipped,
+    # fetched/rendered ones continue from their saved payload without refetching
+    resume = {tk: checkpoint.resume_point(tk) for tk in targets if tk in mapping}
+    resumed = [tk for tk, (stage, _) in resume.items() if stage == 'written']
+    todo = [tk for tk in resume if tk not in resumed]
+    if resumed:
+        print('RESUME_SKIP', resumed, flush=True)
+    need = [tk for tk in todo if resume[tk][0] is None]
+    symbols = sorted({p for tk in need for p in [tk] + PEER_GROUP.get(tk, [])})
+    for p in providers:
+        p.prepare(symbols)
+    fetched = prefetch(need, providers)
+    # 429s seen so far (writes and prefetched reads): only a unit with none since the last relax may relax the backoff
+    throttled = PACER.events['throttled']
+    for tk in todo:
+        stage, ent = resume[tk]
+        if stage is None:
+            _, data, err = next(fetched)
+        else:
+            data, err = ent.get('data'), None
+            print(f'RESUME {tk} from={stage}', flush=True)
+        pid = mapping[tk]['id']
+        try:
+            if err:
+                raise err
+            if data:
+                datas[tk] = data
+            if stage == 'rendered':
+                blocks = ent['blocks']
+            else:
+                if stage is None:
+                    checkpoint.mark(tk, 'fetched', data=data)
+                lines = build_content(tk, data)
+                blocks = to_notion_blocks(lines)
+                checkpoint.mark(tk, 'rendered', blocks=blocks)
+            if PAGE_HASHES.unchanged(pid, blocks):
+                if TOUCH_UNCHANGED:
+                    NOTION.sync_children(pid, blocks)
+                unchanged.append(tk)
+                checkpoint.mark(tk, 'written')
+                print(f'UNCHANGED {tk} touched={TOUCH_UNCHANGED}', flush=True)
+                continue
+            changed = PAGE_HASHES.changed_sections(pid, blocks)
+            waited = PACER.wait()
+            if waited:
+                print(f'PACED {tk} waited={waited:.1f}s', flush=True)
+            sync = NOTION.sync_children(pid, blocks)
+            if sync['archive_failed']:
+                archive_failed[tk] = sync['archive_failed']
+                print('ARCHIVE_FAILED', tk, len(sync['archive_failed']), flush=True)
+            else:
+                PAGE_HASHES.record(pid, blocks, ticker=tk)
+                PAGE_HASHES.save()
+                checkpoint.mark(tk, 'written')
+            updated.append(tk)
+            if PACER.events['throttled'] == throttled:
+                PACER.ok()
+            throttled = PACER.events['throttled']
+            PACER.done()
+            print(f"UPDATED {tk} {datetime.datetime.now().isoformat()} sections={changed} kept={sync['kept']} updated={sync['updated']} inserted={sync['inserted']} archived={sync['archived']}", flush=True)
+        except Exception as e:
+            failed.append((tk, f'{type(e).__name__}:{e}'))
+            checkpoint.fail(tk, f'{type(e).__name__}:{e}')
+            print('ERROR', tk, e, flush=True)
+            traceback.print_exc()
+
+        if len(updated) % 3 == 0:
+            stop, usage = check_usage_and_maybe_stop(len(updated))
+            PACER.usage(usage)
+            print(f'USAGE_CHECK after {len(updated)} usage={usage} interval={PACER.interval:.0f}s', flush=True)
+            if stop:
+                break
+    fetched.close()
+    FUNDAMENTALS.save()
+
+    result = {'updated': updated, 'unchanged': unchanged, 'resumed_skip': resumed, 'failed': failed, 'archive_failed': archive_failed,
+              'stopped': len(updated) + len(unchanged) + len(resumed) < len(targets), 'timestamp': datetime.datetime.now().isoformat(),
+              'providers': {p.name: p.stats() for p in providers}, 'collect': dict(_collect_stats), 'notion_stats': NOTION.stats(), 'fundamentals': FUNDAMENTALS.stats(),
+              'metrics': Frame.universe(datas, PEER_GROUP).summary(list(datas)) if datas else {}, 'pacing': PACER.snapshot(), 'tape': TAPE.stats()}
+    with open(f'{WORKSPACE}/{result_name}.json', 'w') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print('DONE', json.dumps(result, ensure_ascii=False), flush=True)
+    return result
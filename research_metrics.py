@@ -0,0 +1,125 @@
+import numpy as np
+
+# point-in-time fields held per ticker, and the subset compared within peer groups
+VALUE_FIELDS = ('price', 'market_cap', 'pe', 'fpe', 'roe', 'fcf', 'fcf_yield', 'rev_growth', 'rev_growth_5y', 'op_margin')
+PEER_METRICS = ('pe', 'fpe', 'rev_growth', 'rev_growth_5y', 'op_margin', 'fcf_yield')
+# annual rows, as in research_providers / fundamentals_store: (fiscal_year, revenue, op_income, net_income, fcf)
+HISTORY = ('revenue', 'op_income', 'net_income', 'fcf')
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _val(x):
+    return None if np.isnan(x) else float(x)
+
+
+class Frame:
+    """Report metrics for a set of tickers, computed as whole-array operations.
+
+    `records` maps ticker -> canonical field dict (info or peer record), `rows`
+    maps ticker -> annual rows newest first, `groups` maps ticker -> peer symbols
+    (every ticker is in its own group; None puts all tickers in one group).
+
+    Derived on construction: fcf_yield where a provider did not supply it,
+    yearly operating / net / FCF margins, revenue YoY and CAGR over the stored
+    years, and for every PEER_METRICS field the z-score and rank percentile
+    (0 = lowest, 1 = highest) of each ticker within its peer group.
+    """
+
+    def __init__(self, tickers, records, rows=None, groups=None, years=5):
+        self.tickers = list(tickers)
+        self.index = {tk: i for i, tk in enumerate(self.tickers)}
+        n = len(self.tickers)
+        self.values = {f: np.array([_num(records.get(tk, {}).get(f)) for tk in self.tickers]) for f in VALUE_FIELDS}
+        self.years = np.zeros((n, years), dtype=int)
+        self.hist = {m: np.full((n, years), np.nan) for m in HISTORY}
+        for tk, rs in (rows or {}).items():
+            i = self.index.get(tk)
+            if i is None or not rs:
+                continue
+            rs = rs[:years]
+            self.years[i, :len(rs)] = [int(str(r[0])[:4]) for r in rs]
+            block = np.array([[_num(v) for v in r[1:]] for r in rs])
+            for j, m in enumerate(HISTORY):
+                self.hist[m][i, :len(rs)] = block[:, j]
+        if groups is None:
+            self.groups = np.ones((n, n), dtype=bool)
+        else:
+            self.groups = np.eye(n, dtype=bool)
+            for tk, members in groups.items():
+                i = self.index.get(tk)
+                if i is not None:
+                    self.groups[i, [self.index[p] for p in members if p in self.index]] = True
+        self._derive()
+
+    def _derive(self):
+        v, h = self.values, self.hist
+        with np.errstate(divide='ignore', invalid='ignore'):
+            calc = v['fcf'] / v['market_cap']
+            self.derived = {'fcf_yield': np.isnan(v['fcf_yield']) & np.isfinite(calc) & (v['market_cap'] > 0)}
+            v['fcf_yield'] = np.where(self.derived['fcf_yield'], calc, v['fcf_yield'])
+
+            rev = np.where(h['revenue'] > 0, h['revenue'], np.nan)
+            self.margins = {'op_margin': h['op_income'] / rev, 'net_margin': h['net_income'] / rev, 'fcf_margin': h['fcf'] / rev}
+            self.rev_yoy = rev[:, 0] / rev[:, 1] - 1
+            # CAGR from the oldest positive revenue back to the latest year
+            ok = ~np.isnan(rev)
+            span = rev.shape[1] - 1 - np.argmax(ok[:, ::-1], axis=1)
+            oldest = rev[np.arange(len(rev)), span]
+            self.rev_cagr = np.where(ok.any(1) & (span > 0), (rev[:, 0] / oldest) ** (1.0 / np.maximum(span, 1)) - 1, np.nan)
+
+            # peer statistics for all compared fields at once: (fields, ticker, member)
+            x = np.vstack([v[f] for f in PEER_METRICS])
+            member = self.groups[None, :, :] & ~np.isnan(x)[:, None, :]
+            cnt = member.sum(2)
+            xs = np.where(member, x[:, None, :], 0.0)
+            mean = xs.sum(2) / cnt
+            sd = np.sqrt(np.where(member, (x[:, None, :] - mean[:, :, None]) ** 2, 0.0).sum(2) / cnt)
+            below = (member & (x[:, None, :] < x[:, :, None])).sum(2)
+            z = np.where(sd > 0, (x - mean) / sd, np.nan)
+            pct = np.where(~np.isnan(x) & (cnt > 1), below / (cnt - 1), np.nan)
+        self.z = dict(zip(PEER_METRICS, z))
+        self.pct = dict(zip(PEER_METRICS, pct))
+
+    @classmethod
+    def for_report(cls, ticker, data):
+        """One ticker's peer group from a fetch_data() payload (the ticker's full info included)."""
+        tickers = list(data['peers'])
+        if ticker not in tickers:
+            tickers.insert(0, ticker)
+        records = dict(data['peers'], **{ticker: data['info']})
+        return cls(tickers, records, rows={ticker: data['info'].get('rows')})
+
+    @classmethod
+    def universe(cls, datas, groups):
+        """Every ticker of a run in one frame: `datas` maps ticker -> fetch_data() payload."""
+        records, rows = {}, {}
+        for tk, d in datas.items():
+            for p, rec in d['peers'].items():
+                records.setdefault(p, rec)
+        for tk, d in datas.items():
+            records[tk] = d['info']
+            rows[tk] = d['info'].get('rows')
+        return cls(sorted(records), records, rows=rows, groups={tk: groups.get(tk, []) for tk in datas})
+
+    def row(self, ticker):
+        i = self.index[ticker]
+        out = {f: _val(self.values[f][i]) for f in VALUE_FIELDS}
+        out.update(rev_yoy=_val(self.rev_yoy[i]), rev_cagr=_val(self.rev_cagr[i]))
+        for f in PEER_METRICS:
+            out[f + '_z'] = _val(self.z[f][i])
+            out[f + '_pct'] = _val(self.pct[f][i])
+        return out
+
+    def history(self, ticker):
+        """[(year, {op_margin, net_margin, fcf_margin}), ...] newest first, years with data only."""
+        i = self.index[ticker]
+        return [(int(y), {k: _val(m[i, j]) for k, m in self.margins.items()}) for j, y in enumerate(self.years[i]) if y]
+
+    def summary(self, tickers=None):
+        return {tk: self.row(tk) for tk in tickers or self.tickers}
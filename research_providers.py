@@ -0,0 +1,429 @@
+import os, re, json, time, calendar, datetime, threading
+from urllib import request, parse, error
+from http_cache import CachedFetcher
+from notion_api import TokenBucket, retry_after
+from pacing import file_lock
+from stockanalysis_extract import NUM_RX, STAT_FIELDS, extract_page, first_ci, parse_statistics, search_ci
+
+# Canonical report fields. Amounts are plain numbers in the quote currency,
+# ratios/margins/growth are fractions (0.12 == 12%), `rows` is
+# [(fiscal_year, revenue, operating_income, net_income, fcf), ...] newest first.
+FIELDS = (
+    'name', 'sector', 'industry', 'employees', 'currency', 'price', 'market_cap', 'website', 'description',
+    'pe', 'fpe', 'roe', 'eps', 'de', 'ev_ebitda', 'fcf', 'fcf_yield', 'rev_growth', 'rev_growth_5y', 'op_margin',
+    'n_analyst', 'target_mean', 'target_high', 'target_low', 'recommendation', 'recommendation_mean', 'consensus',
+    'rows',
+)
+PEER_FIELDS = ('market_cap', 'pe', 'fpe', 'rev_growth', 'rev_growth_5y', 'op_margin', 'fcf', 'fcf_yield')
+
+_SCALE = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'million': 1e6, 'b': 1e9, 'billion': 1e9, 't': 1e12, 'trillion': 1e12}
+_AMOUNT_RX = re.compile(r'(-?[0-9][0-9,]*\.?[0-9]*)\s*(%|[a-z]+)?')
+
+
+def parse_amount(s, scale=1.0):
+    """'1.23B' / '$1.23 billion' / '12.5%' / '1,234' -> float (percent -> fraction), None if unparseable."""
+    if s is None:
+        return None
+    if isinstance(s, (int, float)):
+        return float(s)
+    m = _AMOUNT_RX.search(str(s).replace('$', '').lower())
+    if not m:
+        return None
+    v = float(m.group(1).replace(',', ''))
+    unit = m.group(2)
+    if unit == '%':
+        return v / 100
+    return v * _SCALE.get(unit, 1.0) * scale
+
+
+class Provider:
+    """One source of report fields.
+
+    fetch(ticker) returns a dict of FIELDS it could fill, fetch_peer(ticker) the
+    PEER_FIELDS used in the comparison table. Missing values are simply absent
+    (or None); errors propagate so the engine can fall back to other providers.
+    `fields` / `peer_fields` declare what the provider can supply at best, and
+    `links` are source URL templates ({tk}, {lower}) for the report footer.
+    """
+
+    name = None
+    fields = ()
+    peer_fields = ()
+    links = ()
+
+    def prepare(self, tickers):
+        """Optional warm-up with every symbol a run will need (e.g. batched quotes)."""
+
+    def fetch(self, ticker):
+        raise NotImplementedError
+
+    def fetch_peer(self, ticker):
+        rec = self.fetch(ticker)
+        return {k: rec.get(k) for k in PEER_FIELDS if rec.get(k) is not None}
+
+    def stats(self):
+        return {}
+
+
+class YahooProvider(Provider):
+    """Yahoo Finance quoteSummary / v7 quote / fundamentals-timeseries.
+
+    Quotes are fetched once per (ticker, module set) per run, optionally kept in a
+    TTL disk cache, and price-level fields for all symbols come from one batched
+    v7 request in prepare().
+    """
+
+    name = 'yahoo'
+    fields = ('name', 'sector', 'industry', 'employees', 'currency', 'price', 'market_cap', 'website', 'pe', 'fpe', 'roe', 'eps', 'de',
+              'ev_ebitda', 'fcf', 'rev_growth', 'op_margin', 'n_analyst', 'target_mean', 'target_high', 'target_low',
+              'recommendation', 'recommendation_mean', 'rows')
+    peer_fields = ('market_cap', 'pe', 'fpe', 'rev_growth', 'op_margin', 'fcf')
+    links = (
+        'https://finance.yahoo.com/quote/{tk}',
+        'https://finance.yahoo.com/quote/{tk}/financials',
+        'https://finance.yahoo.com/quote/{tk}/cash-flow',
+        'https://finance.yahoo.com/quote/{tk}/balance-sheet',
+        'https://finance.yahoo.com/quote/{tk}/analysis',
+        'https://finance.yahoo.com/quote/{tk}/key-statistics',
+        'https://query2.finance.yahoo.com/v10/finance/quoteSummary/{tk}?modules=assetProfile,price,defaultKeyStatistics,financialData,recommendationTrend,summaryDetail',
+        'https://query1.finance.yahoo.com/ws/fundamentals-timeseries/v1/finance/timeseries/{tk}',
+    )
+
+    QUOTE_MODULES = 'assetProfile,price,defaultKeyStatistics,financialData,recommendationTrend,summaryDetail'
+    # modules still needed per symbol once price/summaryDetail fields come from the batch endpoint
+    UNBATCHED_MODULES = 'assetProfile,defaultKeyStatistics,financialData,recommendationTrend'
+    BATCH_FIELDS = {
+        'name': ('longName', 'shortName'), 'market_cap': ('marketCap',), 'currency': ('currency',),
+        'price': ('regularMarketPrice',), 'pe': ('trailingPE',), 'fpe': ('forwardPE',), 'eps': ('epsTrailingTwelveMonths',),
+    }
+    TIMESERIES_TYPES = ('annualTotalRevenue', 'annualOperatingIncome', 'annualNetIncome', 'annualFreeCashFlow')
+
+    def __init__(self, tape, user_agent='Mozilla/5.0', on_throttle=None, cache_path=None, cache_ttl=0.0, store=None, store_ttl=0.0, retries=4,
+                 rate=None, max_concurrent=None, bucket=None):
+        self.tape = tape
+        self.user_agent = user_agent
+        self.on_throttle = on_throttle
+        self.retries = retries  # 429s retried per request, waiting out Retry-After
+        # every Yahoo request draws from one bucket (`bucket` may be shared across processes) and at most
+        # `max_concurrent` are in flight, however many prefetch / fan-out threads ask at once
+        self.bucket = bucket or (TokenBucket(rate) if rate else None)
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl  # seconds; 0 = run-scoped only
+        self.store = store  # FundamentalsStore; annual rows are then fetched incrementally
+        self.store_ttl = store_ttl  # seconds a ticker's stored rows are used without asking for new periods
+        self._quotes = {}
+        self._batch = {}
+        self._disk = None
+        self._locks = {}
+        self._disk_lock = threading.Lock()
+        # Yahoo's own throttle state: after a 429 every Yahoo request waits until _hold_until
+        self._hold_until = 0.0
+        self._hold_lock = threading.Lock()
+        self._throttled = 0
+
+    def _throttle(self, wait):
+        with self._hold_lock:
+            self._throttled += 1
+            self._hold_until = max(self._hold_until, time.monotonic() + wait)
+        if self.bucket:
+            self.bucket.pause(wait)
+        if self.on_throttle:
+            self.on_throttle(wait)
+
+    def _open(self, req, timeout):
+        if self.bucket:
+            self.bucket.acquire()
+        with self.tape.urlopen(req, timeout=timeout) as r:
+            return json.loads(r.read().decode('utf-8'))
+
+    def http_json(self, url, timeout=25):
+        req = request.Request(url, headers={'User-Agent': self.user_agent})
+        for attempt in range(self.retries + 1):
+            hold = self._hold_until - time.monotonic()
+            if hold > 0:
+                time.sleep(hold)
+            try:
+                if not self._slots:
+                    return self._open(req, timeout)
+                with self._slots:
+                    return self._open(req, timeout)
+            except error.HTTPError as e:
+                if e.code != 429 or attempt == self.retries:
+                    raise
+                self._throttle(retry_after(e.headers, min(30.0, 0.5 * 2 ** attempt)))
+
+    def _disk_cache(self):
+        if self._disk is None:
+            self._disk = {}
+            if self.cache_ttl > 0 and self.cache_path:
+                try:
+                    self._disk = json.load(open(self.cache_path))
+                except Exception:
+                    self._disk = {}
+        return self._disk
+
+    def batch_quote(self, symbols, chunk=50):
+        # v7 multi-symbol quote: price-level fields for many symbols per round-trip
+        out = {}
+        for i in range(0, len(symbols), chunk):
+            j = self.http_json('https://query1.finance.yahoo.com/v7/finance/quote?' + parse.urlencode({'symbols': ','.join(symbols[i:i + chunk])}))
+            for r in j.get('quoteResponse', {}).get('result') or []:
+                out[r.get('symbol')] = {k: next((r[f] for f in src if r.get(f) is not None), None) for k, src in self.BATCH_FIELDS.items()}
+        return out
+
+    def prepare(self, tickers):
+        try:
+            self._batch.update(self.batch_quote(sorted(set(tickers))))
+        except Exception as e:
+            print('BATCH_QUOTE_FAILED', f'{type(e).__name__}:{e}', flush=True)
+
+    def quote(self, ticker, modules=QUOTE_MODULES):
+        # one fetch per (ticker, modules) per run; peers reuse earlier results
+        # (the per-key lock keeps concurrent fetch workers from requesting the same symbol twice)
+        key = (ticker, modules)
+        with self._locks.setdefault(key, threading.Lock()):
+            if key in self._quotes:
+                return self._quotes[key]
+            dk = f'{ticker}|{modules}|v2'
+            with self._disk_lock:
+                ent = self._disk_cache().get(dk) if self.cache_ttl > 0 else None
+            if ent and time.time() - ent.get('fetchedAt', 0) < self.cache_ttl:
+                self._quotes[key] = ent['quote']
+                return ent['quote']
+            b = self._batch.get(ticker) if modules == self.QUOTE_MODULES else None
+            if b:
+                q = self._quote_summary(ticker, self.UNBATCHED_MODULES)
+                q.update({k: v for k, v in b.items() if v is not None})
+            else:
+                q = self._quote_summary(ticker, modules)
+            self._quotes[key] = q
+        if self.cache_ttl > 0 and self.cache_path and q:
+            # other processes (run shards) write the same file: merge with the disk copy under the lock, newest entry wins
+            with self._disk_lock, file_lock(self.cache_path + '.lock'):
+                disk = self._disk_cache()
+                disk[dk] = {'fetchedAt': time.time(), 'quote': q}
+                try:
+                    on_disk = json.load(open(self.cache_path))
+                except Exception:
+                    on_disk = {}
+                for k, ent in on_disk.items():
+                    if ent.get('fetchedAt', 0) > disk.get(k, {}).get('fetchedAt', 0):
+                        disk[k] = ent
+                tmp = f'{self.cache_path}.{os.getpid()}.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(disk, f, ensure_ascii=False)
+                os.replace(tmp, self.cache_path)
+        return q
+
+    def _quote_summary(self, ticker, modules):
+        j = self.http_json(f'https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules={modules}')
+        r = j.get('quoteSummary', {}).get('result')
+        if not r:
+            return {}
+        m = r[0]
+
+        def gv(path):
+            cur = m
+            for p in path.split('.'):
+                if not isinstance(cur, dict) or p not in cur:
+                    return None
+                cur = cur[p]
+            if isinstance(cur, dict):
+                return cur.get('raw')
+            return cur
+
+        de = gv('financialData.debtToEquity')
+        q = {
+            'name': gv('price.longName') or gv('price.shortName'),
+            'sector': gv('assetProfile.sector'),
+            'industry': gv('assetProfile.industry'),
+            'employees': gv('assetProfile.fullTimeEmployees'),
+            'market_cap': gv('price.marketCap'),
+            'currency': gv('price.currency'),
+            'price': gv('price.regularMarketPrice'),
+            'website': gv('assetProfile.website'),
+            'pe': gv('summaryDetail.trailingPE') or gv('defaultKeyStatistics.trailingPE'),
+            'fpe': gv('summaryDetail.forwardPE') or gv('defaultKeyStatistics.forwardPE'),
+            'roe': gv('financialData.returnOnEquity'),
+            'eps': gv('defaultKeyStatistics.trailingEps'),
+            'de': de / 100 if de is not None else None,  # Yahoo reports D/E in percent
+            'ev_ebitda': gv('defaultKeyStatistics.enterpriseToEbitda'),
+            'fcf': gv('financialData.freeCashflow'),
+            'rev_growth': gv('financialData.revenueGrowth'),
+            'op_margin': gv('financialData.operatingMargins'),
+            'n_analyst': gv('financialData.numberOfAnalystOpinions'),
+            'target_mean': gv('financialData.targetMeanPrice'),
+            'target_high': gv('financialData.targetHighPrice'),
+            'target_low': gv('financialData.targetLowPrice'),
+            'recommendation': gv('financialData.recommendationKey'),
+            'recommendation_mean': gv('financialData.recommendationMean'),
+        }
+        return {k: v for k, v in q.items() if v is not None}
+
+    def timeseries(self, ticker, since=None, n=5):
+        """Annual rows newest first; `since` (a fiscal year) limits the request to that year onwards, `n=None` keeps all."""
+        now = int(time.time())
+        start = calendar.timegm((since, 1, 1, 0, 0, 0)) if since else now - 8 * 365 * 24 * 3600
+        u = 'https://query1.finance.yahoo.com/ws/fundamentals-timeseries/v1/finance/timeseries/' + ticker
+        u += '?' + parse.urlencode({'type': ','.join(self.TIMESERIES_TYPES), 'period1': start, 'period2': now})
+        j = self.http_json(u)
+        bucket = {}
+        for item in j.get('timeseries', {}).get('result', []):
+            for k, v in item.items():
+                if not k.startswith('annual'):
+                    continue
+                for e in v:
+                    d = e.get('asOfDate')
+                    y = datetime.datetime.utcfromtimestamp(d).strftime('%Y') if isinstance(d, int) else str(d or '')[:4]
+                    bucket.setdefault(y, {})[k] = (e.get('reportedValue') or {}).get('raw')
+        return [(y,) + tuple(bucket[y].get(t) for t in self.TIMESERIES_TYPES) for y in sorted(bucket, reverse=True)[:n]]
+
+    def history(self, ticker):
+        if self.store is None:
+            return self.timeseries(ticker)
+        if not self.store.fresh(ticker, self.store_ttl, self.name):
+            # re-ask for the latest stored year too so restatements land, everything older stays as stored
+            self.store.upsert(ticker, self.timeseries(ticker, since=self.store.latest_year(ticker), n=None), self.name)
+        return self.store.history(ticker, 5)
+
+    def fetch(self, ticker):
+        rec = dict(self.quote(ticker))
+        rows = self.history(ticker)
+        if rows:
+            rec['rows'] = rows
+        return rec
+
+    def fetch_peer(self, ticker):
+        q = self.quote(ticker)
+        return {k: q[k] for k in self.peer_fields if q.get(k) is not None}
+
+    def stats(self):
+        return {'quotes': len(self._quotes), 'batched': len(self._batch), 'throttled': self._throttled}
+
+
+FY_RX = re.compile(r'FY\s*(20\d{2})')
+
+
+def first(pattern, text, flags=re.I, low=None):
+    if flags & re.I:
+        return first_ci(pattern, text, low, flags)
+    m = re.search(pattern, text, flags)
+    return m.group(1).strip() if m else None
+
+
+def numlist_from_segment(label, next_label, text, count=6, low=None):
+    m = search_ci(rf'{re.escape(label)}\s+(.+?){re.escape(next_label)}', text, low)
+    if not m:
+        return []
+    return NUM_RX.findall(text, m.start(1), m.end(1))[:count]
+
+
+class StockAnalysisProvider(Provider):
+    """stockanalysis.com statistics / company / financials pages.
+
+    Every URL is fetched at most once per run through a CachedFetcher (on-disk
+    ETag/Last-Modified revalidation when `cache_dir` is set) and parsed once.
+    """
+
+    name = 'stockanalysis'
+    fields = ('name', 'description', 'employees', 'price', 'market_cap', 'pe', 'fpe', 'roe', 'eps', 'de', 'ev_ebitda', 'fcf_yield',
+              'rev_growth_5y', 'op_margin', 'n_analyst', 'target_mean', 'consensus', 'rows')
+    peer_fields = ('market_cap', 'pe', 'fpe', 'rev_growth_5y', 'op_margin', 'fcf_yield')
+    links = (
+        'https://stockanalysis.com/stocks/{lower}/',
+        'https://stockanalysis.com/stocks/{lower}/company/',
+        'https://stockanalysis.com/stocks/{lower}/financials/',
+        'https://stockanalysis.com/stocks/{lower}/statistics/',
+        'https://stockanalysis.com/stocks/{lower}/financials/balance-sheet/',
+        'https://stockanalysis.com/stocks/{lower}/financials/cash-flow-statement/',
+        'https://stockanalysis.com/stocks/{lower}/forecast/',
+        'https://www.sec.gov/edgar/search/#/q={tk}',
+    )
+
+    def __init__(self, tape, user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36',
+                 cache_dir=None, min_interval=0.3, budget=None):
+        import requests  # only this provider needs it
+        s = requests.Session()
+        s.headers.update({'User-Agent': user_agent})
+        self.fetcher = CachedFetcher(tape.session(s), cache_dir=cache_dir, min_interval=min_interval, budget=budget)
+        self._pages = {}
+        self._statistics = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def page(self, url):
+        with self._lock:
+            lock = self._locks.setdefault(url, threading.Lock())
+        with lock:
+            if url not in self._pages:
+                self._pages[url] = extract_page(self.fetcher.get(url))
+            return self._pages[url]
+
+    def statistics(self, ticker):
+        # peers and targets overlap, so each statistics page is parsed once per run
+        with self._lock:
+            lock = self._locks.setdefault(('statistics', ticker), threading.Lock())
+        with lock:
+            if ticker not in self._statistics:
+                self._statistics[ticker] = parse_statistics(self.page(f'https://stockanalysis.com/stocks/{ticker.lower()}/statistics/'))
+            return self._statistics[ticker]
+
+    def company(self, ticker):
+        pg = self.page(f'https://stockanalysis.com/stocks/{ticker.lower()}/company/')
+        name = first(rf'(.+?)\s*\({ticker}\) Company Profile', pg.text, low=pg.low) or first(r'(.+?)\s+engages in', pg.text, low=pg.low)
+        desc = first(r'---\s*(.+)', pg.text, re.S) or pg.text[:600]
+        return name, desc
+
+    def financials(self, ticker):
+        pg = self.page(f'https://stockanalysis.com/stocks/{ticker.lower()}/financials/')
+        txt, low = pg.text, pg.low
+        years = []
+        for y in FY_RX.findall(txt):
+            if y not in years:
+                years.append(y)
+            if len(years) >= 5:
+                break
+        if len(years) < 5:
+            return []
+        cols = [
+            numlist_from_segment('Revenue', 'Revenue Growth', txt, 6, low),
+            numlist_from_segment('Operating Income', 'Interest Expense', txt, 6, low),
+            numlist_from_segment('Net Income ', 'Net Income to Common', txt, 6, low) or numlist_from_segment('Net Income', 'Net Income to Common', txt, 6, low),
+            numlist_from_segment('Free Cash Flow', 'Free Cash Flow Per Share', txt, 6, low),
+        ]
+        # a 6th value is the TTM column ahead of the fiscal years
+        cols = [c[1:6] if len(c) >= 6 else c for c in cols]
+        return [(y,) + tuple(parse_amount(c[i], 1e6) if i < len(c) else None for c in cols) for i, y in enumerate(years[:5])]
+
+    def _stats_fields(self, st):
+        return {
+            'price': parse_amount(st.get('price')),
+            'market_cap': parse_amount(st.get('market_cap')),
+            'pe': parse_amount(st.get('pe')),
+            'fpe': parse_amount(st.get('fpe')),
+            'ev_ebitda': parse_amount(st.get('ev_ebitda')),
+            'de': parse_amount(st.get('de')),
+            'roe': parse_amount(st.get('roe')),
+            'eps': parse_amount(st.get('eps')),
+            'fcf_yield': parse_amount(st.get('fcf_yield')),
+            'target_mean': parse_amount(st.get('target')),
+            'consensus': st.get('consensus'),
+            'n_analyst': parse_amount(st.get('analyst_count')),
+            'employees': parse_amount(st.get('employees')),
+            'rev_growth_5y': parse_amount(st.get('rev_growth_5y')),
+            'op_margin': parse_amount(st.get('op_margin')),
+        }
+
+    def fetch(self, ticker):
+        rec = self._stats_fields(self.statistics(ticker))
+        rec['name'], rec['description'] = self.company(ticker)
+        rec['rows'] = self.financials(ticker)
+        return {k: v for k, v in rec.items() if v not in (None, '', [])}
+
+    def fetch_peer(self, ticker):
+        st = self._stats_fields(self.statistics(ticker))
+        return {k: st[k] for k in self.peer_fields if st.get(k) is not None}
+
+    def stats(self):
+        return {'fields': STAT_FIELDS.stats(), 'fetch': self.fetcher.stats()}
@@ -0,0 +1,61 @@
+import os, sys, json, argparse, datetime, subprocess
+import research_engine as E
+
+RESULT='research_refresh_result'
+
+
+def run_shards(args,targets):
+    # one child process per hash shard; they share the workspace and, through RESEARCH_BUDGET_DIR, the Notion/stockanalysis rate
+    env=dict(os.environ,RESEARCH_WORKSPACE=E.WORKSPACE)
+    env.setdefault('RESEARCH_BUDGET_DIR',f'{E.WORKSPACE}/memory/budget')
+    procs=[]
+    for i in range(args.shards):
+        cenv=dict(env)
+        if E.TAPE.active:
+            cenv['RESEARCH_HTTP_TAPE']=f'{E.TAPE.path}.shard{i}of{args.shards}'
+        try:
+            os.remove(f'{E.WORKSPACE}/{RESULT}.shard{i}of{args.shards}.json')
+        except OSError:
+            pass
+        cmd=[sys.executable,os.path.abspath(__file__),'--shard',str(i),'--shards',str(args.shards),'--providers',args.providers,'--tickers',','.join(targets)]
+        procs.append(subprocess.Popen(cmd,env=cenv))
+    parts=[];crashed=[]
+    for i,p in enumerate(procs):
+        rc=p.wait()
+        try:
+            parts.append(json.load(open(f'{E.WORKSPACE}/{RESULT}.shard{i}of{args.shards}.json')))
+        except (OSError,ValueError):
+            crashed.append((i,rc))
+    result=E.merge_results(parts)
+    result.update(shards_failed=crashed,timestamp=datetime.datetime.now().isoformat())
+    if crashed:
+        result['stopped']=True
+    with open(f'{E.WORKSPACE}/{RESULT}.json','w') as f:
+        json.dump(result,f,ensure_ascii=False,indent=2)
+    print('DONE', json.dumps({k:result.get(k) for k in ('updated','unchanged','failed','shards','shards_failed')},ensure_ascii=False),flush=True)
+    return result
+
+
+def main():
+    ap=argparse.ArgumentParser(description='Refresh the research pages, merging every provider per field')
+    ap.add_argument('--providers',default='yahoo,stockanalysis',help='comma-separated, in priority order')
+    ap.add_argument('--tickers',help='comma-separated subset of the targets')
+    ap.add_argument('--shards',type=int,default=int(os.environ.get('RESEARCH_SHARDS','1')),help='split the targets by hash across this many processes')
+    ap.add_argument('--shard',type=int,help='run only this shard (0-based) of --shards, e.g. one per host')
+    args=ap.parse_args()
+    if args.shards<1:
+        ap.error('--shards must be at least 1')
+    if args.shard is not None and not 0<=args.shard<args.shards:
+        ap.error(f'--shard must be in 0..{args.shards-1}')
+    targets=args.tickers.split(',') if args.tickers else E.TARGETS
+    if args.shards>1 and args.shard is None:
+        return run_shards(args,targets)
+    name=RESULT
+    if args.shard is not None:
+        targets=E.shard(targets,args.shard,args.shards)
+        name=f'{RESULT}.shard{args.shard}of{args.shards}'
+    # one journal for every shard count, so rerunning with a different --shards still resumes
+    return E.run(E.make_providers(args.providers.split(',')),name,targets,checkpoint_name=f'{RESULT}-checkpoint')
+
+if __name__=='__main__':
+    main()
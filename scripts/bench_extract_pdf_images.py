@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Wall time of skills/paper-summary-to-notion/scripts/extract_pdf_images.py by
+worker count, on a synthetic paper-like PDF or saved ones.
+
+The synthetic document has `--pages` pages, each with a few large figures
+(noisy RGB JPEGs and RGBA PNGs, so decode/re-encode cost is realistic), small
+icons under the --min-px cut, and a logo repeated on every page (dedup).
+
+Usage:
+  python3 scripts/bench_extract_pdf_images.py [--pdf paper.pdf ...] [--pages 30] [--workers 1,2,4] [--repeat 3]
+
+Every worker count must produce the same file names and bytes as workers=1;
+a mismatch is reported as "identical": false.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "skills" / "paper-summary-to-notion" / "scripts"))
+import fitz  # noqa: E402
+from PIL import Image  # noqa: E402
+from extract_pdf_images import extract_images_from_pdf  # noqa: E402
+
+
+def _image(w, h, fmt, alpha, seed):
+    rnd = random.Random(seed)
+    noise = Image.effect_noise((w, h), 40 + rnd.random() * 40)
+    im = Image.merge("RGB", (noise, noise.rotate(90, expand=False), Image.linear_gradient("L").resize((w, h))))
+    if alpha:
+        im.putalpha(Image.linear_gradient("L").resize((w, h)))
+    out = io.BytesIO()
+    im.save(out, format=fmt, quality=90)
+    return out.getvalue()
+
+
+def synthetic_pdf(path, pages, seed=7):
+    rnd = random.Random(seed)
+    logo = _image(120, 60, "PNG", True, seed)
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(fitz.Rect(20, 20, 80, 50), stream=logo)
+        y = 70
+        for k in range(rnd.randint(1, 3)):
+            w, h = rnd.choice([(900, 600), (1200, 800), (640, 480)])
+            data = _image(w, h, "PNG" if k % 2 else "JPEG", bool(k % 2), seed * 1000 + p * 10 + k)
+            page.insert_image(fitz.Rect(60, y, 550, y + 200), stream=data)
+            y += 220
+        for k in range(rnd.randint(2, 6)):
+            icon = _image(32, 32, "PNG", True, seed * 7000 + p * 10 + k)
+            page.insert_image(fitz.Rect(20 + 40 * k, 740, 52 + 40 * k, 772), stream=icon)
+    doc.save(path)
+    doc.close()
+
+
+def outputs(out_dir):
+    return {p.name: hashlib.sha1(p.read_bytes()).hexdigest() for p in sorted(out_dir.iterdir())}
+
+
+def run(pdf, workers, repeat, tmp):
+    best, files = float("inf"), None
+    for _ in range(repeat):
+        work = Path(tempfile.mkdtemp(dir=tmp))
+        src = work / pdf.name
+        shutil.copy(pdf, src)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            extract_images_from_pdf(str(src), workers=workers, image_store=None)
+        best = min(best, time.perf_counter() - t0)
+        files = outputs(work / src.stem)
+        shutil.rmtree(work)
+    return round(best, 3), files
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", nargs="*", help="PDFs to extract (default: a synthetic one)")
+    ap.add_argument("--pages", type=int, default=30, help="pages of the synthetic PDF")
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-pdf-images-")
+    try:
+        pdfs = [Path(p) for p in args.pdf or []]
+        if not pdfs:
+            pdfs = [Path(tmp, "synthetic.pdf")]
+            synthetic_pdf(pdfs[0], args.pages)
+        rows = []
+        for pdf in pdfs:
+            base = None
+            for w in [int(x) for x in args.workers.split(",") if x]:
+                secs, files = run(pdf, w, args.repeat, tmp)
+                base = base or (secs, files)
+                rows.append({"pdf": pdf.name, "workers": w, "seconds": secs, "images": len(files),
+                             "speedup": round(base[0] / secs, 2) if secs else None, "identical": files == base[1]})
+    finally:
+        shutil.rmtree(tmp)
+
+    print(json.dumps({"cpus": os.cpu_count(), "repeat": args.repeat, "runs": rows}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+End-to-end timing of the research refresh scripts against a local mock of
+Yahoo Finance, stockanalysis.com and the Notion API.
+
+  redo        : notion_phase2_redo.main()               (Yahoo -> Notion)
+  alt_sources : notion_phase2_retry_alt_sources.main()  (stockanalysis.com -> Notion)
+  refresh     : research_refresh.main()                 (both providers merged per field -> Notion)
+
+The mock answers every upstream in-process on 127.0.0.1 with synthetic but
+well-formed data, after `--latency` ms (+ up to `--jitter` ms), and returns 429
++ Retry-After once a host exceeds `--rate` requests/s (`--notion-rate` for Notion).
+The scripts reach it through NOTION_API_BASE and RESEARCH_HTTP_UPSTREAM (see
+http_tape) and keep their state in a scratch RESEARCH_WORKSPACE.
+
+Stage seconds are summed over all threads and exclusive (time inside a nested
+stage is counted there only):
+
+  fetch   network round-trips (YahooProvider.http_json / CachedFetcher.get)
+  parse   turning responses into fields (provider quote/timeseries/page extraction)
+  render  building the lines and Notion blocks
+  sync    listing children and in-place block updates
+  append  appending new blocks
+  archive archiving removed blocks
+
+Usage:
+  python3 scripts/bench_research_refresh.py [--scripts redo,alt_sources,refresh] [--latency 50]
+      [--jitter 0] [--rate 0] [--notion-rate 0] [--passes 1] [--universe 0] [--shards 1] [--out result.json]
+
+--universe N runs against a synthetic universe file of N tickers (peer groups of
+three) instead of research_universe.json; --shards K runs `refresh` as K hash
+shards in child processes, so its stage timers stay empty and request counts
+come from the mock.
+
+--passes 2 reruns on the same workspace and mock state; the checkpoint is
+disabled (RESEARCH_RESUME_HOURS=0) so the rerun measures the page-hash skip path.
+Stage times include client-side pacing (the Notion token bucket). A script whose provider dependencies are not installed is
+reported as skipped.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib import parse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from stockanalysis_extract import STAT_LABELS  # noqa: E402
+
+SCRIPTS = {"redo": "notion_phase2_redo", "alt_sources": "notion_phase2_retry_alt_sources", "refresh": "research_refresh"}
+MOCK_TICKERS = ["MRVL", "QCOM", "ON", "MU", "AMD", "PLTR", "PFE", "DHR", "SYK", "TRGP", "OXY", "EQT", "MS", "C", "AXP"]
+
+
+def _num(tk, salt, lo, hi):
+    h = int(hashlib.sha1(f"{tk}:{salt}".encode()).hexdigest()[:8], 16)
+    return lo + (hi - lo) * (h / 0xFFFFFFFF)
+
+
+def _raw(v):
+    return {"raw": v, "fmt": f"{v}"}
+
+
+# ---------------------------------------------------------------- upstream mocks
+
+def yahoo_quote_v7(symbols):
+    return {"quoteResponse": {"result": [{
+        "symbol": s, "longName": f"{s} Holdings Inc.", "currency": "USD",
+        "marketCap": int(_num(s, "mcap", 1e10, 2e12)), "regularMarketPrice": round(_num(s, "px", 10, 500), 2),
+        "trailingPE": round(_num(s, "pe", 5, 80), 2), "forwardPE": round(_num(s, "fpe", 5, 60), 2),
+        "epsTrailingTwelveMonths": round(_num(s, "eps", 0.5, 20), 2),
+    } for s in symbols], "error": None}}
+
+
+def yahoo_quote_summary(tk):
+    return {"quoteSummary": {"result": [{
+        "price": {"longName": f"{tk} Holdings Inc.", "currency": "USD", "marketCap": _raw(int(_num(tk, "mcap", 1e10, 2e12))),
+                  "regularMarketPrice": _raw(round(_num(tk, "px", 10, 500), 2))},
+        "assetProfile": {"sector": "Technology", "industry": "Semiconductors", "fullTimeEmployees": int(_num(tk, "emp", 1e3, 2e5)),
+                         "website": f"https://www.{tk.lower()}.example"},
+        "summaryDetail": {"trailingPE": _raw(round(_num(tk, "pe", 5, 80), 2)), "forwardPE": _raw(round(_num(tk, "fpe", 5, 60), 2))},
+        "defaultKeyStatistics": {"trailingEps": _raw(round(_num(tk, "eps", 0.5, 20), 2)), "enterpriseToEbitda": _raw(round(_num(tk, "eve", 4, 40), 2))},
+        "financialData": {
+            "returnOnEquity": _raw(round(_num(tk, "roe", -0.1, 0.5), 4)), "debtToEquity": _raw(round(_num(tk, "de", 0, 200), 2)),
+            "freeCashflow": _raw(int(_num(tk, "fcf", 1e8, 5e10))), "revenueGrowth": _raw(round(_num(tk, "rg", -0.2, 0.6), 4)),
+            "operatingMargins": _raw(round(_num(tk, "om", -0.1, 0.5), 4)), "numberOfAnalystOpinions": _raw(int(_num(tk, "na", 5, 50))),
+            "targetMeanPrice": _raw(round(_num(tk, "tp", 10, 600), 2)), "targetHighPrice": _raw(round(_num(tk, "th", 20, 800), 2)),
+            "targetLowPrice": _raw(round(_num(tk, "tl", 5, 300), 2)), "recommendationKey": "buy",
+            "recommendationMean": _raw(round(_num(tk, "rm", 1, 4), 2)),
+        },
+        "recommendationTrend": {"trend": []},
+    }], "error": None}}
+
+
+def yahoo_timeseries(tk, types, period1=0):
+    since = time.gmtime(int(period1)).tm_year if period1 else 0
+    result = []
+    for t in types:
+        result.append({"meta": {"symbol": [tk], "type": [t]}, t: [
+            {"asOfDate": f"{y}-12-31", "reportedValue": _raw(int(_num(tk, f"{t}{y}", 1e8, 1e11)))} for y in range(2018, 2026) if y >= since]})
+    return {"timeseries": {"result": result, "error": None}}
+
+
+def sa_statistics(tk):
+    vals = {
+        "market_cap": f"{_num(tk, 'mcap', 10, 2000):.2f}B", "pe": f"{_num(tk, 'pe', 5, 80):.2f}", "fpe": f"{_num(tk, 'fpe', 5, 60):.2f}",
+        "ev_ebitda": f"{_num(tk, 'eve', 4, 40):.2f}", "de": f"{_num(tk, 'de', 0, 2):.2f}", "roe": f"{_num(tk, 'roe', 1, 50):.2f}%",
+        "eps": f"{_num(tk, 'eps', 0.5, 20):.2f}", "fcf_yield": f"{_num(tk, 'fy', 0.5, 8):.2f}%", "target": f"{_num(tk, 'tp', 10, 600):.2f}",
+        "consensus": "Buy", "analyst_count": str(int(_num(tk, "na", 5, 50))), "employees": f"{int(_num(tk, 'emp', 1e3, 2e5)):,}",
+        "rev_growth_5y": f"{_num(tk, 'rg5', 1, 30):.2f}%", "op_margin": f"{_num(tk, 'om', 1, 50):.2f}%",
+    }
+    rows = "".join(f"<tr><td>{labels[0]}</td><td>{vals[k]}</td></tr>" for k, labels in STAT_LABELS.items())
+    prose = " ".join(f"<p>{tk} statistics paragraph {i}: valuation, margins and growth history.</p>" for i in range(200))
+    script = "<script>" + "window.__data={};" * 3000 + "</script>"
+    return (f"<html><head>{script}</head><body><h1>{tk} Statistics</h1><div>USD {_num(tk, 'px', 10, 500):.2f}</div>"
+            f"<p>{tk} has a market cap or net worth of ${vals['market_cap'][:-1]} billion.</p>{prose}<table>{rows}</table></body></html>")
+
+
+def sa_company(tk):
+    return (f"<html><body><h1>{tk} Holdings Inc. ({tk.upper()}) Company Profile</h1>"
+            f"<p>--- {tk} Holdings Inc. engages in the design and sale of products worldwide. " + "Details. " * 80 + "</p></body></html>")
+
+
+def sa_financials(tk):
+    years = [f"FY {y}" for y in range(2025, 2019, -1)]
+    def row(label, salt):
+        return f"<tr><td>{label}</td>" + "".join(f"<td>{_num(tk, salt + str(i), 100, 90000):,.0f}</td>" for i in range(6)) + "</tr>"
+    return ("<html><body><table><tr><td>Fiscal Year</td>" + "".join(f"<td>{y}</td>" for y in years) + "</tr>"
+            + row("Revenue", "rev") + row("Revenue Growth", "rg") + row("Operating Income", "op") + row("Interest Expense", "ie")
+            + row("Net Income", "ni") + row("Net Income to Common", "nic") + row("Free Cash Flow", "fcf") + row("Free Cash Flow Per Share", "fps")
+            + "</table></body></html>")
+
+
+class NotionStore:
+    """Just enough of the Notion block API: child pages under any unknown parent, flat block lists per page."""
+
+    def __init__(self, tickers):
+        self.lock = threading.Lock()
+        self.pages = {f"page-{tk.lower()}": tk for tk in tickers}
+        self.children = {pid: [] for pid in self.pages}
+        self.blocks = {}
+
+    @staticmethod
+    def _out(b):
+        t = b["type"]
+        rt = [dict(r, plain_text=(r.get("text") or {}).get("content", "")) for r in (b.get(t) or {}).get("rich_text", [])]
+        return dict(b, **{t: dict(b.get(t) or {}, rich_text=rt)})
+
+    def list(self, parent, q):
+        with self.lock:
+            if parent not in self.children:
+                items = [{"object": "block", "id": pid, "type": "child_page", "child_page": {"title": f"{tk} 기업 리서치"}} for pid, tk in self.pages.items()]
+            else:
+                items = [self._out(self.blocks[i]) for i in self.children[parent] if not self.blocks[i].get("archived")]
+        size = int(q.get("page_size", ["100"])[0])
+        start = int(q.get("start_cursor", ["0"])[0])
+        nxt = start + size
+        return {"object": "list", "results": items[start:nxt], "has_more": nxt < len(items), "next_cursor": str(nxt) if nxt < len(items) else None}
+
+    def append(self, parent, body):
+        with self.lock:
+            kids = self.children.setdefault(parent, [])
+            pos = kids.index(body["after"]) + 1 if body.get("after") in kids else len(kids)
+            made = []
+            for b in body.get("children", []):
+                bid = str(uuid.uuid4())
+                self.blocks[bid] = dict(b, id=bid)
+                made.append(bid)
+            kids[pos:pos] = made
+            return {"object": "list", "results": [self._out(self.blocks[i]) for i in made]}
+
+    def update(self, bid, body):
+        with self.lock:
+            b = self.blocks.setdefault(bid, {"id": bid, "type": "paragraph", "paragraph": {"rich_text": []}})
+            if body.get("archived"):
+                b["archived"] = True
+            for k, v in body.items():
+                if k != "archived":
+                    b[k] = dict(b.get(k) or {}, **v)
+            return self._out(b)
+
+    def create_page(self, body):
+        pid = f"page-{uuid.uuid4()}"
+        with self.lock:
+            self.children[pid] = []
+        return {"object": "page", "id": pid}
+
+
+class Mock:
+    def __init__(self, latency=0.0, jitter=0.0, rate=0.0, notion_rate=0.0, seed=7, tickers=MOCK_TICKERS):
+        self.latency, self.jitter = latency, jitter
+        self.rates = {"notion": notion_rate, "yahoo": rate, "stockanalysis": rate}
+        self.windows = {}
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.notion = NotionStore(tickers)
+        self.counts = {}
+
+    def count(self, host, key, n=1):
+        with self.lock:
+            c = self.counts.setdefault(host, {"requests": 0, "throttled": 0, "bytes": 0})
+            c[key] += n
+
+    def admit(self, host):
+        """False when `host` already served `rate` requests in the last second."""
+        rate = self.rates.get(host)
+        if not rate:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            w = [t for t in self.windows.get(host, []) if now - t < 1.0]
+            ok = len(w) < rate
+            if ok:
+                w.append(now)
+            self.windows[host] = w
+        return ok
+
+    def delay(self):
+        with self.lock:
+            d = self.latency + (self.rnd.random() * self.jitter if self.jitter else 0.0)
+        if d:
+            time.sleep(d)
+
+    def route(self, method, path, body):
+        """(host, status, content_type, payload)."""
+        u = parse.urlsplit(path)
+        q = parse.parse_qs(u.query)
+        parts = [p for p in u.path.split("/") if p]
+        if parts and parts[0] == "v1":
+            if method == "GET" and parts[1] == "blocks" and parts[-1] == "children":
+                return "notion", 200, "json", self.notion.list(parts[2], q)
+            if method == "PATCH" and parts[1] == "blocks" and parts[-1] == "children":
+                return "notion", 200, "json", self.notion.append(parts[2], body)
+            if method == "PATCH" and parts[1] == "blocks":
+                return "notion", 200, "json", self.notion.update(parts[2], body)
+            if method == "POST" and parts[1] == "pages":
+                return "notion", 200, "json", self.notion.create_page(body)
+            return "notion", 404, "json", {"object": "error", "status": 404, "code": "object_not_found"}
+        host = parts[0] if parts else ""
+        if host.endswith("finance.yahoo.com"):
+            if parts[1:3] == ["v7", "finance"]:
+                return "yahoo", 200, "json", yahoo_quote_v7(q.get("symbols", [""])[0].split(","))
+            if "quoteSummary" in parts:
+                return "yahoo", 200, "json", yahoo_quote_summary(parts[-1])
+            if "timeseries" in parts:
+                return "yahoo", 200, "json", yahoo_timeseries(parts[-1], q.get("type", [""])[0].split(","), q.get("period1", ["0"])[0])
+            return "yahoo", 404, "json", {}
+        if host == "stockanalysis.com" and len(parts) >= 4:
+            tk = parts[2].upper()
+            page = {"statistics": sa_statistics, "company": sa_company, "financials": sa_financials}.get(parts[3])
+            if page:
+                return "stockanalysis", 200, "html", page(tk)
+        return host or "unknown", 404, "html", "<html>not found</html>"
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                body = json.loads(raw) if raw else {}
+                host, status, kind, payload = mock.route(self.command, self.path, body)
+                mock.count(host, "requests")
+                mock.delay()
+                if not mock.admit(host):
+                    mock.count(host, "throttled")
+                    status, kind, payload = 429, "json", {"object": "error", "status": 429, "code": "rate_limited"}
+                data = (json.dumps(payload, ensure_ascii=False) if kind == "json" else payload).encode("utf-8")
+                mock.count(host, "bytes", len(data))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json" if kind == "json" else "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = _serve
+
+        return Handler
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.counts))
+
+
+# ---------------------------------------------------------------- stage timers
+
+class Stages:
+    """Exclusive wall time per stage, summed across threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.totals = {}
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            stack = self.local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                spent = time.perf_counter() - t0
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += spent
+                with self.lock:
+                    s = self.totals.setdefault(stage, {"calls": 0, "seconds": 0.0})
+                    s["calls"] += 1
+                    s["seconds"] += spent - nested
+        return timed
+
+    def snapshot(self):
+        with self.lock:
+            return {k: {"calls": v["calls"], "seconds": round(v["seconds"], 3)} for k, v in sorted(self.totals.items())}
+
+
+def instrument(engine, stages):
+    """Wrap the engine / provider functions that make up each stage (fresh modules per run)."""
+    import http_cache
+    import research_providers as rp
+    n = engine.NOTION
+    n.sync_children = stages.wrap("sync", n.sync_children)
+    n.append_children = stages.wrap("append", n.append_children)
+    n.archive_blocks = stages.wrap("archive", n.archive_blocks)
+    rp.YahooProvider.http_json = stages.wrap("fetch", rp.YahooProvider.http_json)
+    http_cache.CachedFetcher.get = stages.wrap("fetch", http_cache.CachedFetcher.get)
+    for cls, fns in ((rp.YahooProvider, ("_quote_summary", "timeseries")), (rp.StockAnalysisProvider, ("page", "statistics", "company", "financials"))):
+        for fn in fns:
+            setattr(cls, fn, stages.wrap("parse", getattr(cls, fn)))
+    engine.build_content = stages.wrap("render", engine.build_content)
+    engine.to_notion_blocks = stages.wrap("render", engine.to_notion_blocks)
+    # codexbar is not part of the refresh being measured
+    engine.check_usage_and_maybe_stop = lambda done_count: (False, None)
+
+
+def synthetic_universe(n):
+    tickers = (MOCK_TICKERS + [f"X{i:03d}" for i in range(n)])[:n]
+    groups = [tickers[i:i + 3] for i in range(0, n, 3)]
+    return {"targets": tickers, "peers": {tk: [p for p in g if p != tk] for g in groups for tk in g}, "styles": {}}
+
+
+def run_script(name, workspace, extra_args=()):
+    modname = SCRIPTS[name]
+    for m in (modname, "research_engine", "research_providers", "http_cache", "http_tape", "notion_api"):
+        sys.modules.pop(m, None)
+    os.environ["RESEARCH_WORKSPACE"] = workspace
+    engine = importlib.import_module("research_engine")
+    mod = importlib.import_module(modname)
+    stages = Stages()
+    instrument(engine, stages)
+    log = io.StringIO()
+    argv, sys.argv = sys.argv, [modname, *extra_args]
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            result = mod.main()
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    finally:
+        sys.argv = argv
+    wall = time.perf_counter() - t0
+    done = len(result.get("updated", [])) + len(result.get("unchanged", []))
+    engine.NOTION.close()
+    return {
+        "wall_seconds": round(wall, 3),
+        "tickers": done,
+        "tickers_per_minute": round(done * 60 / wall, 2) if wall else None,
+        "updated": len(result.get("updated", [])),
+        "unchanged": len(result.get("unchanged", [])),
+        "resumed": len(result.get("resumed_skip", [])),
+        "failed": result.get("failed", []),
+        "stages": stages.snapshot(),
+        "providers": result.get("providers"),
+        "collect": result.get("collect"),
+        "notion": {k: v for k, v in (result.get("notion_stats") or engine.NOTION.stats()).items() if k != "by_method"},
+        "pacing": result.get("pacing"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scripts", default=",".join(SCRIPTS), help="comma-separated subset of: " + ",".join(SCRIPTS))
+    ap.add_argument("--latency", type=float, default=50.0, help="mock response latency (ms)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many ms")
+    ap.add_argument("--rate", type=float, default=0.0, help="Yahoo/stockanalysis requests per second before 429 (0 = unlimited)")
+    ap.add_argument("--notion-rate", type=float, default=0.0, help="Notion requests per second before 429 (0 = unlimited)")
+    ap.add_argument("--passes", type=int, default=1, help="runs per script on the same workspace")
+    ap.add_argument("--universe", type=int, default=0, help="synthetic universe of this many tickers (0 = research_universe.json)")
+    ap.add_argument("--shards", type=int, default=1, help="run `refresh` as this many hash shards")
+    ap.add_argument("--out", help="also write the JSON report here")
+    args = ap.parse_args()
+
+    home = tempfile.mkdtemp(prefix="bench-research-")
+    tickers = MOCK_TICKERS
+    if args.universe:
+        universe = synthetic_universe(args.universe)
+        tickers = universe["targets"]
+        Path(home, "universe.json").write_text(json.dumps(universe))
+        os.environ["RESEARCH_UNIVERSE"] = str(Path(home, "universe.json"))
+    mock = Mock(args.latency / 1000, args.jitter / 1000, args.rate, args.notion_rate, tickers=tickers)
+    base = mock.start()
+    os.makedirs(os.path.join(home, ".config", "notion"))
+    Path(home, ".config", "notion", "api_key").write_text("bench-key")
+    os.environ.update({"HOME": home, "NOTION_API_BASE": base, "RESEARCH_HTTP_UPSTREAM": base, "RESEARCH_HTTP_MODE": "off", "RESEARCH_RESUME_HOURS": "0"})
+
+    report = {
+        "config": {"latency_ms": args.latency, "jitter_ms": args.jitter, "rate": args.rate, "notion_rate": args.notion_rate, "passes": args.passes,
+                   "universe": len(tickers), "shards": args.shards},
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": [],
+    }
+    try:
+        for name in [s for s in args.scripts.split(",") if s]:
+            workspace = os.path.join(home, name)
+            os.makedirs(workspace, exist_ok=True)
+            for i in range(args.passes):
+                before = mock.snapshot()
+                run = run_script(name, workspace, ["--shards", str(args.shards)] if name == "refresh" and args.shards > 1 else [])
+                after = mock.snapshot()
+                run["requests"] = {h: {k: v - before.get(h, {}).get(k, 0) for k, v in c.items()} for h, c in after.items()}
+                report["runs"].append(dict(script=name, run=i + 1, **run))
+                if "skipped" in run:
+                    break
+    finally:
+        mock.stop()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
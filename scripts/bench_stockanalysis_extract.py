@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Per-page CPU time of stockanalysis.com statistics extraction, before vs after.
+
+  before: the baseline notion_phase2_retry_alt_sources.fetch_stats, verbatim:
+          BeautifulSoup(html, 'html.parser').get_text + its original patterns
+          (including the greedy `average price target .* is`), one re.search each
+  after : stockanalysis_extract.extract_page (single streaming parse) + parse_statistics
+          (table rows, then the precompiled FieldTable over the lower-cased text)
+
+Usage:
+  python3 scripts/bench_stockanalysis_extract.py --save MU AMD     # save real pages as fixtures (needs network)
+  python3 scripts/bench_stockanalysis_extract.py [--fixtures DIR] [--repeat 5]
+
+DIR (default scripts/fixtures/stockanalysis) holds saved statistics pages
+(<ticker>.html). Without any, a synthetic page is measured and the report says
+"synthetic": true -- its speedup says little about real pages. The "before"
+side is skipped if bs4 is not installed.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from urllib import request
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from stockanalysis_extract import STAT_LABELS, extract_page, parse_statistics  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "stockanalysis"
+UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
+
+# copied verbatim from the baseline notion_phase2_retry_alt_sources.fetch_stats
+BASELINE_PATTERNS = [
+    ("price", r'USD\s+([0-9]+\.[0-9]+)'),
+    ("market_cap", r'market cap or net worth of \$([0-9.,]+\s+[A-Za-z]+)'),
+    ("pe", r'PE ratio is ([0-9.]+)'),
+    ("fpe", r'forward PE ratio is ([0-9.]+)'),
+    ("ev_ebitda", r'EV/EBITDA ratio is ([0-9.]+)'),
+    ("de", r'Debt / Equity ratio of ([0-9.]+)'),
+    ("roe", r'Return on equity \(ROE\) is ([0-9.]+%)'),
+    ("eps", r'Earnings per share was \$([0-9.]+)'),
+    ("fcf_yield", r'FCF Yield\s+([0-9.]+%)'),
+    ("target", r'average price target .* is \$([0-9.]+)'),
+    ("consensus", r'consensus rating is "([A-Za-z]+)"'),
+    ("analyst_count", r'Analyst Count\s+([0-9]+)'),
+    ("employees", r'Employee Count\s*([0-9,]+)'),
+    ("rev_growth_5y", r'Revenue Growth Forecast \(5Y\)\s*([0-9.]+%)'),
+    ("op_margin", r'Operating Margin\s*([0-9.]+%)'),
+]
+
+
+def synthetic_page(rows=400, filler=600):
+    labels = [l for ls in STAT_LABELS.values() for l in ls]
+    trs = "".join(f"<tr><td>{labels[i % len(labels)] if i < len(labels) else f'Metric {i}'}</td><td>{i}.{i % 97:02d}</td></tr>" for i in range(rows))
+    prose = " ".join(f"<p>Paragraph {i} about the company, its market cap or net worth and outlook.</p>" for i in range(filler))
+    script = "<script>" + "var x=1;" * 20000 + "</script>"
+    return f"<html><head>{script}</head><body><h1>USD 123.45</h1>{prose}<table>{trs}</table>{prose}</body></html>"
+
+
+def before(html):
+    from bs4 import BeautifulSoup
+    txt = BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+    out = {}
+    for k, pat in BASELINE_PATTERNS:
+        m = re.search(pat, txt, re.I)
+        out[k] = m.group(1).strip() if m else None
+    return out
+
+
+def save(tickers, out_dir):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for tk in tickers:
+        req = request.Request(f"https://stockanalysis.com/stocks/{tk.lower()}/statistics/", headers={"User-Agent": UA})
+        with request.urlopen(req, timeout=30) as r:
+            (out_dir / f"{tk.lower()}.html").write_bytes(r.read())
+        print("saved", out_dir / f"{tk.lower()}.html")
+
+
+def after(html):
+    return parse_statistics(extract_page(html))
+
+
+def cpu_ms(fn, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn(html)
+        best = min(best, time.process_time() - t0)
+    return round(best * 1000, 2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fixtures", default=str(FIXTURES), help=f"directory of saved statistics pages (default: {FIXTURES})")
+    ap.add_argument("--save", nargs="+", metavar="TICKER", help="download these tickers' statistics pages into --fixtures and exit")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.save:
+        return save(args.save, Path(args.fixtures))
+    pages = {p.name: p.read_text(encoding="utf-8", errors="ignore") for p in sorted(Path(args.fixtures).glob("*.html"))}
+    synthetic = not pages
+    if synthetic:
+        pages = {"synthetic.html": synthetic_page()}
+
+    try:
+        import bs4  # noqa: F401
+        have_bs4 = True
+    except ImportError:
+        have_bs4 = False
+
+    rows = []
+    for name, html in pages.items():
+        row = {"page": name, "bytes": len(html), "after_ms": cpu_ms(after, html, args.repeat)}
+        if have_bs4:
+            row["before_ms"] = cpu_ms(before, html, args.repeat)
+            row["speedup"] = round(row["before_ms"] / row["after_ms"], 2) if row["after_ms"] else None
+        rows.append(row)
+
+    print(json.dumps({"bs4": have_bs4, "synthetic": synthetic, "repeat": args.repeat, "pages": rows}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
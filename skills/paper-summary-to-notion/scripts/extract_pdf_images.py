@@ -2,11 +2,21 @@
 import argparse
 import hashlib
 import io
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import fitz  # PyMuPDF
 from PIL import Image
 
+# 실행/문서 간 공유하는 내용 주소 이미지 저장소(objects/<sha256 앞 2자리>/<sha256>.<ext>)
+IMAGE_STORE = Path('/home/soyu/.openclaw/workspace/memory/pdf-image-store')
+
+# Notion 이미지 블록에 그대로 올릴 수 있는 형식(그 외 jpx/jb2/tiff 등은 PNG로 변환)
+NOTION_IMAGE_EXTS = ("png", "jpg", "jpeg", "gif")
+
 
 def _flatten_alpha_to_white(image_bytes: bytes, fallback_ext: str) -> tuple[bytes, str]:
     """RGBA/LA/P 팔레트+투명도를 흰 배경 RGB로 평탄화한다."""
@@ -19,14 +29,22 @@ def _flatten_alpha_to_white(image_bytes: bytes, fallback_ext: str) -> tuple[byte
             merged.save(out, format="PNG")
             return out.getvalue(), "png"
 
-        # alpha가 없으면 원본 확장자 유지
+        # alpha가 없으면 원본 확장자 유지(Notion 비호환 형식은 PNG로)
         out = io.BytesIO()
-        fmt = "PNG" if fallback_ext.lower() == "png" else "JPEG" if fallback_ext.lower() in ("jpg", "jpeg") else "PNG"
+        fmt = "JPEG" if fallback_ext.lower() in ("jpg", "jpeg") else "PNG"
         # JPEG 저장 전 RGB 보장
         if fmt == "JPEG":
             im = im.convert("RGB")
         im.save(out, format=fmt)
-        return out.getvalue(), fallback_ext.lower() if fallback_ext else "png"
+        return out.getvalue(), fallback_ext.lower() if fmt == "JPEG" else "png"
+
+
+def _needs_transcode(image_bytes: bytes, ext: str) -> bool:
+    """투명도가 있거나(평탄화 필요) Notion 비호환 형식/CMYK면 True. Image.open은 헤더만 읽으므로 디코딩하지 않는다."""
+    if ext.lower() not in NOTION_IMAGE_EXTS:
+        return True
+    with Image.open(io.BytesIO(image_bytes)) as im:
+        return im.mode in ("RGBA", "LA", "PA", "CMYK") or "transparency" in im.info
 
 
 def _passes_min_size(image_bytes: bytes, min_px: int) -> bool:
@@ -35,17 +53,121 @@ def _passes_min_size(image_bytes: bytes, min_px: int) -> bool:
         return max(w, h) >= min_px
 
 
-def extract_images_from_pdf(pdf_path_str: str, flatten_alpha: bool = True, min_px: int = 300) -> int:
+def _page_placements(page) -> list[tuple[int, float, float, int, int]]:
+    """페이지 내 xref별 대표 배치 좌표(첫 등장 위치)를 표시 순서(y -> x)로 정렬해 (xref, y0, x0, width, height)로 반환한다."""
+    placement_map = {}
+    sizes = {}
+    for img in page.get_images(full=True):
+        xref = img[0]
+        sizes[xref] = (img[2], img[3])  # PDF 이미지 객체의 픽셀 크기(디코딩 불필요)
+        try:
+            rects = page.get_image_rects(xref)
+        except Exception:
+            rects = []
+
+        if not rects:
+            pos = (float('inf'), float('inf'))
+        else:
+            pos = min((float(r.y0), float(r.x0)) for r in rects)
+
+        if xref not in placement_map or pos < placement_map[xref]:
+            placement_map[xref] = pos
+
+    return sorted([(xref, yx[0], yx[1]) + sizes[xref] for xref, yx in placement_map.items()], key=lambda t: (t[1], t[2], t[0]))
+
+
+def _first_pages(doc) -> dict[int, int]:
+    """xref별 처음 등장하는 페이지 인덱스(메타데이터만 읽음)."""
+    first = {}
+    for page_idx in range(len(doc)):
+        for img in doc[page_idx].get_images(full=True):
+            first.setdefault(img[0], page_idx)
+    return first
+
+
+def _page_images(doc, page_idx: int, flatten_alpha: bool, min_px: int, first_pages: dict[int, int]) -> tuple[list[tuple[str, bytes, str, str]], dict]:
+    """한 페이지의 이미지를 배치 순서대로 변환/필터링해 ((sha256, bytes, ext, 처리 경로) 목록, 처리 통계)로 반환한다."""
+    out = []
+    stats = {"small_skipped": 0, "xref_skipped": 0}
+    for xref, y0, x0, width, height in _page_placements(doc[page_idx]):
+        # 앞 페이지에서 이미 처리한 xref(반복 로고 등)는 추출하지 않는다
+        if first_pages.get(xref, page_idx) < page_idx:
+            stats["xref_skipped"] += 1
+            continue
+
+        # 크기 필터를 메타데이터로 먼저 적용: 작은 아이콘/로고는 추출·디코딩·재인코딩하지 않는다
+        if width and height and max(width, height) < min_px:
+            stats["small_skipped"] += 1
+            continue
+
+        base_image = doc.extract_image(xref)
+        image_bytes = base_image["image"]
+        image_ext = base_image.get("ext", "png")
+
+        if not (width and height):
+            # 메타데이터에 크기가 없을 때만 추출 결과의 크기, 그마저 없으면 디코딩해서 판단
+            width, height = base_image.get("width") or 0, base_image.get("height") or 0
+            if not (max(width, height) >= min_px if width and height else _passes_min_size(image_bytes, min_px)):
+                stats["small_skipped"] += 1
+                continue
+
+        # 변환이 필요 없으면 extract_image 원본 바이트를 그대로 쓴다(JPEG 재압축 손실/CPU 없음)
+        path = "passthrough"
+        if flatten_alpha and _needs_transcode(image_bytes, image_ext):
+            image_bytes, image_ext = _flatten_alpha_to_white(image_bytes, image_ext)
+            path = "transcoded"
+
+        out.append((hashlib.sha256(image_bytes).hexdigest(), image_bytes, image_ext, path))
+    return out, stats
+
+
+def _extract_page_range(task: tuple) -> list[tuple[int, list[tuple[str, bytes, str, str]], dict]]:
+    """[start, stop) 페이지를 처리한다. 워커 프로세스마다 자체 fitz 문서를 연다."""
+    pdf_path, start, stop, flatten_alpha, min_px, first_pages = task
+    doc = fitz.open(pdf_path)
+    try:
+        return [(page_idx, *_page_images(doc, page_idx, flatten_alpha, min_px, first_pages)) for page_idx in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def _page_ranges(n_pages: int, workers: int) -> list[tuple[int, int]]:
+    # 페이지별 이미지 수 편차가 커서 워커 수보다 잘게 나눠 부하를 고르게 분산
+    size = max(1, -(-n_pages // (workers * 4)))
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+
+def _store_image(store: Path, digest: str, image_bytes: bytes, image_ext: str) -> tuple[Path, bool]:
+    """저장소에 객체를 넣고 (경로, 기존 객체 재사용 여부)를 반환한다."""
+    obj = store / "objects" / digest[:2] / f"{digest}.{image_ext}"
+    if obj.exists():
+        return obj, True
+    obj.parent.mkdir(parents=True, exist_ok=True)
+    tmp = obj.with_name(f"{obj.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(image_bytes)
+    os.replace(tmp, obj)
+    return obj, False
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    # 하드링크로 디스크 중복 없이 출력 폴더에 배치(다른 파일시스템이면 복사)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def extract_images_from_pdf(pdf_path_str: str, flatten_alpha: bool = True, min_px: int = 300, workers: int = 1, image_store: Path | None = IMAGE_STORE) -> int:
+    """추출한 이미지 수를 반환한다. 실패(파일 없음, 손상된 PDF, 워커 오류)는 예외로 올려 호출자가 결과로 오인하지 않게 한다."""
     pdf_path = Path(pdf_path_str)
 
     # 1) 파일 확인
     if not pdf_path.exists() or not pdf_path.is_file():
-        print(f"오류: 파일을 찾을 수 없습니다 -> {pdf_path}")
-        return 0
+        raise FileNotFoundError(f"파일을 찾을 수 없습니다 -> {pdf_path}")
 
     if pdf_path.suffix.lower() != ".pdf":
-        print("오류: PDF 파일만 지원합니다.")
-        return 0
+        raise ValueError("PDF 파일만 지원합니다.")
 
     # 2) 저장 폴더 생성 (원본 파일명 기준)
     output_dir = pdf_path.parent / pdf_path.stem
@@ -53,70 +175,64 @@ def extract_images_from_pdf(pdf_path_str: str, flatten_alpha: bool = True, min_p
     print(f"폴더 생성 완료: {output_dir}")
 
     extracted_count = 0
+    workers = workers or os.cpu_count() or 1
 
     # 3) PDF 이미지 추출 (논문 내 배치 순서 기준)
     # 순서 정의: page 오름차순 -> 페이지 내 y(top) 오름차순 -> x(left) 오름차순
+    # workers > 1이면 페이지 구간을 프로세스 풀에 나눠 디코딩/재인코딩하고, 결과는 페이지 순서대로 받아
+    # 중복 제거와 번호 부여를 여기서 순차로 하므로 파일명은 단일 프로세스 실행과 동일하다.
+    pool = None
     try:
-        doc = fitz.open(pdf_path)
+        with fitz.open(pdf_path) as doc:
+            n_pages = len(doc)
+            first_pages = _first_pages(doc)
+        tasks = [(str(pdf_path), start, stop, flatten_alpha, min_px, first_pages) for start, stop in _page_ranges(n_pages, workers)]
+        if workers > 1 and len(tasks) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+            results = pool.map(_extract_page_range, tasks)
+        else:
+            results = map(_extract_page_range, tasks)
 
         seen_img_hashes = set()  # 문서 전체 중복 이미지 제거(동일 바이너리)
+        stats = {}
+
+        for chunk in results:
+            for page_idx, images, page_stats in chunk:
+                for k, v in page_stats.items():
+                    stats[k] = stats.get(k, 0) + v
+                seq = 0
+                for digest, image_bytes, image_ext, path in images:
+                    # 동일 이미지 바이너리 중복 제거(로고/반복 요소 중복 삽입 방지)
+                    if digest in seen_img_hashes:
+                        continue
+                    seen_img_hashes.add(digest)
+
+                    seq += 1
+                    # 이름 규칙 개선: 페이지/순번을 0-pad로 저장해 정렬 안정화
+                    image_name = f"page_{page_idx + 1:03d}_img_{seq:03d}.{image_ext}"
+                    image_filepath = output_dir / image_name
+
+                    if image_store:
+                        # 같은/개정된 논문을 다시 처리해도 동일 이미지는 저장소의 기존 객체를 재사용
+                        obj, reused = _store_image(Path(image_store), digest, image_bytes, image_ext)
+                        _link_or_copy(obj, image_filepath)
+                        stats["store_reused" if reused else "store_new"] = stats.get("store_reused" if reused else "store_new", 0) + 1
+                    else:
+                        with open(image_filepath, "wb") as f:
+                            f.write(image_bytes)
+
+                    extracted_count += 1
+                    stats[path] = stats.get(path, 0) + 1
 
-        for page_idx in range(len(doc)):
-            page = doc[page_idx]
-
-            # 각 xref의 대표 배치 좌표만 사용(페이지 내 첫 등장 위치)
-            placement_map = {}
-            for img in page.get_images(full=True):
-                xref = img[0]
-                try:
-                    rects = page.get_image_rects(xref)
-                except Exception:
-                    rects = []
-
-                if not rects:
-                    pos = (float('inf'), float('inf'))
-                else:
-                    pos = min((float(r.y0), float(r.x0)) for r in rects)
-
-                if xref not in placement_map or pos < placement_map[xref]:
-                    placement_map[xref] = pos
-
-            # 페이지 내 표시 순서로 정렬
-            placements = sorted([(xref, yx[0], yx[1]) for xref, yx in placement_map.items()], key=lambda t: (t[1], t[2], t[0]))
-
-            seq = 0
-            for xref, y0, x0 in placements:
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image.get("ext", "png")
-
-                if flatten_alpha:
-                    image_bytes, image_ext = _flatten_alpha_to_white(image_bytes, image_ext)
-
-                if not _passes_min_size(image_bytes, min_px):
-                    continue
-
-                # 동일 이미지 바이너리 중복 제거(로고/반복 요소 중복 삽입 방지)
-                digest = hashlib.sha1(image_bytes).hexdigest()
-                if digest in seen_img_hashes:
-                    continue
-                seen_img_hashes.add(digest)
-
-                seq += 1
-                # 이름 규칙 개선: 페이지/순번을 0-pad로 저장해 정렬 안정화
-                image_name = f"page_{page_idx + 1:03d}_img_{seq:03d}.{image_ext}"
-                image_filepath = output_dir / image_name
-
-                with open(image_filepath, "wb") as f:
-                    f.write(image_bytes)
-
-                extracted_count += 1
-
-        doc.close()
         print(f"작업 완료: 총 {extracted_count}개의 이미지를 성공적으로 추출했습니다.")
+        print(f"크기 미달로 디코딩 없이 제외: {stats.get('small_skipped', 0)}개, 앞 페이지와 같은 xref라 제외: {stats.get('xref_skipped', 0)}개")
+        print(f"원본 그대로 저장: {stats.get('passthrough', 0)}개, 변환 후 저장: {stats.get('transcoded', 0)}개")
+        if image_store:
+            print(f"이미지 저장소({image_store}): 새 객체 {stats.get('store_new', 0)}개, 기존 객체 재사용 {stats.get('store_reused', 0)}개")
 
-    except Exception as e:
-        print(f"이미지 추출 중 오류가 발생했습니다: {e}")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
 
     return extracted_count
 
@@ -135,6 +251,35 @@ if __name__ == "__main__":
         default=300,
         help="가로/세로 중 큰 변의 최소 픽셀(기본: 300)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="페이지 구간을 나눠 처리할 프로세스 수(기본: 1, 0이면 CPU 코어 수)",
+    )
+    parser.add_argument(
+        "--image-store",
+        default=str(IMAGE_STORE),
+        help=f"실행 간 공유하는 내용 주소 이미지 저장소 경로(기본: {IMAGE_STORE})",
+    )
+    parser.add_argument(
+        "--no-image-store",
+        action="store_true",
+        help="저장소 없이 출력 폴더에 직접 기록",
+    )
     args = parser.parse_args()
 
-    extract_images_from_pdf(args.pdf_path, flatten_alpha=not args.no_flatten_alpha, min_px=args.min_px)
+    try:
+        extract_images_from_pdf(
+            args.pdf_path,
+            flatten_alpha=not args.no_flatten_alpha,
+            min_px=args.min_px,
+            workers=args.workers,
+            image_store=None if args.no_image_store else Path(args.image_store),
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"오류: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"이미지 추출 중 오류가 발생했습니다: {e}")
+        sys.exit(1)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+source_fingerprint(sha256) 기준 논문 PDF 처리 캐시.
+
+<CACHE_ROOT>/<sha256>/ 아래에 단계별 산출물을 보관한다.
+  text.txt / pages.json  pdftotext 전체 텍스트, 페이지별 텍스트(form-feed 분할)
+  pdfinfo.json           pdfinfo 결과
+  metadata.json          paper_metadata.lookup(title) 결과
+  images.json            extract_pdf_images 결과 목록(파일명, sha256) — 이미지 본체는 공유 이미지 저장소
+  selected.json          select_key_images 결과
+  manifest.json          단계별 입력 키(도구 버전/옵션 포함), 산출 파일, 소요 시간
+
+같은 PDF를 다시 처리할 때 입력이 같은 단계는 파일만 읽고 끝난다(cache hit).
+이미지 단계는 hit여도 출력 폴더(<pdf 폴더>/<pdf 이름>/)를 저장소 하드링크로 복원한다.
+
+Usage:
+  python3 scripts/paper_cache.py /path/paper.pdf [--title "원문 제목"] [--stages text,pdfinfo,images,select]
+      [--min-px 300] [--workers 1] [--refresh metadata]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata as pkg_metadata
+from pathlib import Path
+
+CACHE_ROOT = Path('/home/soyu/.openclaw/workspace/memory/paper-cache')
+# 단계 로직이 바뀌면 올려서 기존 캐시를 무효화한다
+STAGE_VERSION = {"text": 1, "pdfinfo": 1, "metadata": 1, "images": 1, "select": 1}
+DEFAULT_STAGES = ("text", "pdfinfo", "images", "select")
+
+
+def fingerprint(pdf_path: Path) -> str:
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _tool_version(cmd: str) -> str | None:
+    # poppler 도구는 -v 결과를 stderr 첫 줄에 출력
+    try:
+        p = subprocess.run([cmd, "-v"], capture_output=True, text=True, timeout=10)
+        return ((p.stderr or p.stdout).strip().splitlines() or [None])[0]
+    except Exception:
+        return None
+
+
+def _package_version(name: str) -> str | None:
+    # 모듈을 import하지 않고 설치 버전만 읽는다(fitz import 비용 회피)
+    try:
+        return pkg_metadata.version(name)
+    except pkg_metadata.PackageNotFoundError:
+        return None
+
+
+def _write_text(path: Path, text: str) -> None:
+    # 실행마다 고유한 임시 파일에 쓴 뒤 교체: 동시 실행이 겹쳐도 반쯤 쓰인 파일이 보이지 않는다
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False) as f:
+        f.write(text)
+    os.replace(f.name, path)
+
+
+def _write_json(path: Path, data) -> None:
+    _write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+class PaperCache:
+    def __init__(self, pdf_path, root: Path = CACHE_ROOT, refresh=()):
+        self.pdf = Path(pdf_path).resolve()
+        self.fingerprint = fingerprint(self.pdf)
+        self.dir = Path(root) / self.fingerprint
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.refresh = set(refresh)
+        self.hits, self.misses = [], []
+        self.manifest = {"fingerprint": self.fingerprint, "stages": {}}
+        mf = self.dir / "manifest.json"
+        if mf.exists():
+            try:
+                self.manifest = json.loads(mf.read_text())
+            except Exception:
+                pass
+        self.manifest["source"] = str(self.pdf)
+        self._tools = {}
+
+    def tool(self, name: str) -> str | None:
+        if name not in self._tools:
+            self._tools[name] = _package_version(name) if name in ("PyMuPDF", "Pillow") else _tool_version(name)
+        return self._tools[name]
+
+    def path(self, name: str) -> Path:
+        return self.dir / name
+
+    def _stage(self, name: str, inputs: dict, files: list[str], build, valid=None):
+        """inputs(도구 버전/옵션)가 같고 산출 파일이 남아 있으면 hit, 아니면 build()로 다시 만든다."""
+        key = hashlib.sha256(json.dumps([STAGE_VERSION[name], inputs], sort_keys=True).encode("utf-8")).hexdigest()
+        ent = self.manifest["stages"].get(name)
+        if (name not in self.refresh and ent and ent.get("key") == key and all(self.path(f).exists() for f in files)
+                and (valid is None or valid(ent.get("result")))):
+            if name not in self.hits and name not in self.misses:
+                self.hits.append(name)
+            return ent.get("result")
+
+        self.refresh.discard(name)  # --refresh는 실행당 한 번만 다시 만든다
+        t0 = time.perf_counter()
+        result = build()
+        self.manifest["stages"][name] = {
+            "key": key,
+            "inputs": inputs,
+            "files": files,
+            "result": result,
+            "builtAt": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+        self.manifest.setdefault("tools", {}).update({k: v for k, v in inputs.items() if k in self._tools})
+        _write_json(self.path("manifest.json"), self.manifest)
+        self.misses.append(name)
+        return result
+
+    # --- stages ---
+
+    def text(self) -> dict:
+        def build():
+            txt = subprocess.check_output(["pdftotext", str(self.pdf), "-"], text=True, errors="ignore")
+            _write_text(self.path("text.txt"), txt)
+            pages = txt.split("\f")  # pdftotext는 form-feed로 페이지를 구분
+            _write_json(self.path("pages.json"), pages)
+            return {"chars": len(txt), "pages": len(pages)}
+
+        return self._stage("text", {"pdftotext": self.tool("pdftotext")}, ["text.txt", "pages.json"], build)
+
+    def pages(self) -> list[str]:
+        self.text()
+        return json.loads(self.path("pages.json").read_text())
+
+    def pdfinfo(self) -> dict:
+        def build():
+            out = subprocess.check_output(["pdfinfo", str(self.pdf)], text=True, errors="ignore")
+            info = {}
+            for line in out.splitlines():
+                k, sep, v = line.partition(":")
+                if sep:
+                    info[k.strip()] = v.strip()
+            _write_json(self.path("pdfinfo.json"), info)
+            return info
+
+        return self._stage("pdfinfo", {"pdfinfo": self.tool("pdfinfo")}, ["pdfinfo.json"], build)
+
+    def metadata(self, title: str) -> dict:
+        def build():
+            from paper_metadata import lookup
+
+            meta = lookup(title)
+            _write_json(self.path("metadata.json"), meta)
+            return meta
+
+        return self._stage("metadata", {"title": title}, ["metadata.json"], build)
+
+    def images(self, min_px: int = 300, flatten_alpha: bool = True, workers: int = 1) -> dict:
+        out_dir = self.pdf.parent / self.pdf.stem
+
+        def build():
+            # extract_pdf_images(fitz)는 miss일 때만 import
+            from extract_pdf_images import IMAGE_STORE, extract_images_from_pdf
+
+            if out_dir.exists():
+                for p in out_dir.glob("page_*_img_*.*"):
+                    p.unlink()
+            # 추출기 진행 로그는 stderr로(stdout은 JSON 결과 전용). 추출 실패는 예외로 올라와 manifest에 기록되지 않는다
+            with contextlib.redirect_stdout(sys.stderr):
+                count = extract_images_from_pdf(str(self.pdf), flatten_alpha=flatten_alpha, min_px=min_px, workers=workers, image_store=IMAGE_STORE)
+            images = [{"name": p.name, "sha256": hashlib.sha256(p.read_bytes()).hexdigest()} for p in sorted(out_dir.glob("page_*_img_*.*"))]
+            if len(images) != count:
+                raise RuntimeError(f"추출 결과 불일치: 반환 {count}개, 출력 폴더 {len(images)}개 ({out_dir})")
+            _write_json(self.path("images.json"), images)
+            return {"dir": str(out_dir), "store": str(IMAGE_STORE), "count": len(images)}
+
+        def objects(result):
+            store = Path(result["store"]) / "objects"
+            return [(im["name"], store / im["sha256"][:2] / f"{im['sha256']}{Path(im['name']).suffix}")
+                    for im in json.loads(self.path("images.json").read_text())]
+
+        inputs = {"min_px": min_px, "flatten_alpha": flatten_alpha, "PyMuPDF": self.tool("PyMuPDF"), "Pillow": self.tool("Pillow")}
+        # 저장소 객체가 하나라도 지워졌으면 miss로 보고 다시 추출
+        result = self._stage("images", inputs, ["images.json"], build,
+                             valid=lambda r: all(src.exists() for _, src in objects(r)))
+        if "images" in self.hits:
+            # hit: 출력 폴더를 저장소 객체 하드링크로 복원(디코딩/추출 없음).
+            # 이전 실행(다른 옵션)이 남긴 이미지는 지워 images.json과 정확히 같게 맞춘다
+            out_dir.mkdir(parents=True, exist_ok=True)
+            wanted = dict(objects(result))
+            for p in out_dir.glob("page_*_img_*.*"):
+                if p.name not in wanted:
+                    p.unlink()
+            for name, src in wanted.items():
+                dest = out_dir / name
+                if dest.exists() and os.path.samefile(dest, src):
+                    continue
+                dest.unlink(missing_ok=True)
+                try:
+                    os.link(src, dest)
+                except OSError:
+                    shutil.copy2(src, dest)
+        return result
+
+    def select(self, **image_opts) -> dict:
+        images = self.images(**image_opts)
+        text = self.text()
+
+        def build():
+            from select_key_images import select_images
+
+            sel = select_images(Path(images["dir"]), [p.lower() for p in self.pages()])
+            _write_json(self.path("selected.json"), sel)
+            return sel
+
+        inputs = {"images": self.manifest["stages"]["images"]["key"], "text": self.manifest["stages"]["text"]["key"], "pages": text["pages"]}
+        return self._stage("select", inputs, ["selected.json"], build)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="논문 PDF 처리 결과를 sha256 fingerprint 기준으로 캐시/재사용합니다.")
+    ap.add_argument("pdf_path", help="처리할 PDF 경로")
+    ap.add_argument("--title", help="메타데이터 조회용 원문 제목(지정 시 metadata 단계 포함)")
+    ap.add_argument("--stages", default=",".join(DEFAULT_STAGES), help=f"실행할 단계(기본: {','.join(DEFAULT_STAGES)})")
+    ap.add_argument("--min-px", type=int, default=300, help="이미지 최소 픽셀(기본: 300)")
+    ap.add_argument("--workers", type=int, default=1, help="이미지 추출 프로세스 수(기본: 1)")
+    ap.add_argument("--refresh", default="", help="캐시를 무시하고 다시 만들 단계(쉼표 구분)")
+    ap.add_argument("--root", default=str(CACHE_ROOT), help=f"캐시 루트(기본: {CACHE_ROOT})")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    cache = PaperCache(args.pdf_path, Path(args.root), refresh=[s for s in args.refresh.split(",") if s])
+    stages = [s for s in args.stages.split(",") if s]
+    if args.title and "metadata" not in stages:
+        stages.append("metadata")
+
+    out = {"fingerprint": cache.fingerprint, "dir": str(cache.dir), "files": {"manifest": str(cache.path("manifest.json"))}}
+    image_opts = {"min_px": args.min_px, "workers": args.workers}
+    for st in stages:
+        if st == "text":
+            out["text"] = cache.text()
+        elif st == "pdfinfo":
+            out["pdfinfo"] = cache.pdfinfo()
+        elif st == "metadata":
+            if not args.title:
+                ap.error("metadata 단계에는 --title이 필요합니다.")
+            out["metadata"] = cache.metadata(args.title)
+        elif st == "images":
+            out["images"] = cache.images(**image_opts)
+        elif st == "select":
+            out["select"] = cache.select(**image_opts)
+        else:
+            ap.error(f"알 수 없는 단계: {st}")
+
+    for ent in cache.manifest["stages"].values():
+        out["files"].update({f: str(cache.path(f)) for f in ent["files"]})
+    out.update(hits=cache.hits, misses=cache.misses, seconds=round(time.perf_counter() - t0, 3))
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -92,13 +92,7 @@ def get_crossref_citations(doi: str):
     return apa, bib
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Fetch paper metadata (year, venue, citation count, APA/BibTeX)")
-    ap.add_argument("--title", required=True)
-    args = ap.parse_args()
-
-    title = args.title
-
+def lookup(title: str) -> dict:
     cr = crossref_search(title)
     oa = openalex_by_title(title)
 
@@ -144,7 +138,15 @@ def main():
         },
         "notes": "If confidence is low (<0.75), verify with Google Scholar manually.",
     }
-    print(json.dumps(out, ensure_ascii=False, indent=2))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fetch paper metadata (year, venue, citation count, APA/BibTeX)")
+    ap.add_argument("--title", required=True)
+    args = ap.parse_args()
+
+    print(json.dumps(lookup(args.title), ensure_ascii=False, indent=2))
 
 
 if __name__ == "__main__":
@@ -104,17 +104,10 @@ def choose(images, page_texts, mode):
     return str(candidates[0][2].resolve())
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--pdf", required=True)
-    ap.add_argument("--images-dir", required=True)
-    args = ap.parse_args()
-
-    pdf = Path(args.pdf)
-    img_dir = Path(args.images_dir)
+def select_images(img_dir: Path, pages):
+    """pages: lower-cased text per page (extract_text_by_page output or cached page text)."""
     images = sorted([p for p in img_dir.iterdir() if p.suffix.lower() in {".png", ".jpg", ".jpeg"}])
 
-    pages = extract_text_by_page(pdf)
     framework = choose(images, pages, "framework")
     platform = choose(images, pages, "platform")
 
@@ -124,7 +117,17 @@ def main():
     if not platform:
         notes.append("No platform/hardware candidate found by heuristic.")
 
-    print(json.dumps({"framework": framework, "platform": platform, "notes": notes}, ensure_ascii=False, indent=2))
+    return {"framework": framework, "platform": platform, "notes": notes}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pdf", required=True)
+    ap.add_argument("--images-dir", required=True)
+    args = ap.parse_args()
+
+    result = select_images(Path(args.images_dir), extract_text_by_page(Path(args.pdf)))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
 
 
 if __name__ == "__main__":
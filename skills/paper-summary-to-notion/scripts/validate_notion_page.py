@@ -11,6 +11,22 @@ def plain(rt):
     return "".join(x.get("plain_text", "") for x in (rt or []))
 
 
+def iter_children(page_id, headers):
+    # has_more/next_cursor를 따라가며 100개 초과 블록도 모두 읽는다.
+    cursor = None
+    while True:
+        params = {"page_size": 100}
+        if cursor:
+            params["start_cursor"] = cursor
+        r = requests.get(f"https://api.notion.com/v1/blocks/{page_id}/children", headers=headers, params=params, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        yield from data.get("results", [])
+        if not data.get("has_more") or not data.get("next_cursor"):
+            return
+        cursor = data["next_cursor"]
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--page-id", required=True)
@@ -21,16 +37,13 @@ def main():
         raise SystemExit("NOTION_API_KEY is required")
 
     h = {"Authorization": f"Bearer {key}", "Notion-Version": NV}
-    r = requests.get(f"https://api.notion.com/v1/blocks/{args.page_id}/children?page_size=100", headers=h, timeout=30)
-    r.raise_for_status()
-
     bad = []
     has_image = False
     has_file = False
     bad_directives = []
     bad_fingerprint = []
 
-    blocks = r.json().get("results", [])
+    blocks = list(iter_children(args.page_id, h))
     img_heading_idx = None
     pdf_heading_idx = None
     image_indices = []
@@ -0,0 +1,192 @@
+import re
+import functools
+from collections import Counter
+from html.parser import HTMLParser
+
+SKIP_TAGS = {'script', 'style', 'template'}
+CELL_TAGS = {'td', 'th'}
+
+
+class Page:
+    __slots__ = ('text', 'low', 'tables')
+
+    def __init__(self, text, tables):
+        self.text = text
+        self.low = text.lower()
+        self.tables = tables
+
+
+class _Extractor(HTMLParser):
+    """Single streaming pass: visible text (same shape as BeautifulSoup
+    get_text(' ', strip=True)) plus a {first cell: second cell} map of table rows."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.tables = {}
+        self.skip = 0
+        self.row = None
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == 'tr':
+            self.row = []
+        elif tag in CELL_TAGS and self.row is not None:
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in CELL_TAGS and self.cell is not None:
+            self.row.append(' '.join(self.cell))
+            self.cell = None
+        elif tag == 'tr' and self.row is not None:
+            if len(self.row) >= 2 and self.row[0] and self.row[0] not in self.tables:
+                self.tables[self.row[0]] = self.row[1]
+            self.row = None
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        s = data.strip()
+        if not s:
+            return
+        self.parts.append(s)
+        if self.cell is not None:
+            self.cell.append(s)
+
+
+def extract_page(html):
+    p = _Extractor()
+    p.feed(html)
+    p.close()
+    return Page(' '.join(p.parts), p.tables)
+
+
+def table_value(page, *labels):
+    """First non-empty table value for any of `labels` ('n/a' / '-' count as missing)."""
+    for label in labels:
+        v = page.tables.get(label)
+        if v and v.strip().lower() not in ('n/a', '-', '--'):
+            return v.strip()
+    return None
+
+
+_ESCAPE_OR_RUN = re.compile(r'\\.|[^\\]+', re.S)
+NUM_RX = re.compile(r'\d{1,3}(?:,\d{3})+')
+
+
+@functools.lru_cache(maxsize=512)
+def compile_ci(pattern, flags=0):
+    """Compile `pattern` for matching against lower-cased text.
+
+    re.I disables the literal-prefix fast scan in CPython's re (about 15x slower
+    on a 100 KB page), so literals are lower-cased once here and the page text
+    once per page instead. Escapes (\\S, \\$ ...) are kept verbatim; named groups
+    are not supported.
+    """
+    low = ''.join(t if t.startswith('\\') else t.lower() for t in _ESCAPE_OR_RUN.findall(pattern))
+    return re.compile(low, flags & ~re.I)
+
+
+def search_ci(pattern, text, low=None, flags=0):
+    """Case-insensitive search; group spans index into `text`."""
+    low = text.lower() if low is None else low
+    if len(low) != len(text):  # non-ASCII case mapping changed offsets
+        return re.compile(pattern, flags | re.I).search(text)
+    return compile_ci(pattern, flags).search(low)
+
+
+def first_ci(pattern, text, low=None, flags=0):
+    m = search_ci(pattern, text, low, flags)
+    return text[m.start(1):m.end(1)].strip() if m else None
+
+
+class FieldTable:
+    """Declarative field extraction: (name, pattern, post) specs compiled once.
+
+    scan() takes the page text plus its lower-cased copy (Page.low) and runs one
+    precompiled search per requested field (`only` narrows the set) over that
+    shared copy, so the page is lower-cased once rather than once per field; each
+    search is still its own scan of the page. Per-field counters record where
+    each value came from: table, regex or miss.
+    """
+
+    def __init__(self, specs):
+        self.specs = [(name, pattern, compile_ci(pattern), post) for name, pattern, post in specs]
+        self.counts = {name: Counter() for name, _, _, _ in self.specs}
+
+    def count(self, name, source):
+        self.counts[name][source] += 1
+
+    def scan(self, text, low=None, only=None):
+        low = text.lower() if low is None else low
+        exact = len(low) == len(text)
+        out = {}
+        for name, pattern, rx, post in self.specs:
+            if only is not None and name not in only:
+                continue
+            m = rx.search(low) if exact else re.search(pattern, text, re.I)
+            v = post(text[m.start(1):m.end(1)]) if m else None
+            self.count(name, 'regex' if v is not None else 'miss')
+            out[name] = v
+        return out
+
+    def stats(self):
+        return {name: dict(c) for name, c in self.counts.items()}
+
+
+def _strip(v):
+    return v.strip() or None
+
+
+# prose patterns over the flattened statistics page (fallback when no table row matches)
+STAT_FIELDS = FieldTable([
+    ('price', r'USD\s+([0-9]+\.[0-9]+)', _strip),
+    ('market_cap', r'market cap or net worth of \$([0-9.,]+\s+[A-Za-z]+)', _strip),
+    ('pe', r'PE ratio is ([0-9.]+)', _strip),
+    ('fpe', r'forward PE ratio is ([0-9.]+)', _strip),
+    ('ev_ebitda', r'EV/EBITDA ratio is ([0-9.]+)', _strip),
+    ('de', r'Debt / Equity ratio of ([0-9.]+)', _strip),
+    ('roe', r'Return on equity \(ROE\) is ([0-9.]+%)', _strip),
+    ('eps', r'Earnings per share was \$([0-9.]+)', _strip),
+    ('fcf_yield', r'FCF Yield\s+([0-9.]+%)', _strip),
+    # bounded and lazy: the old greedy `.*` ran to the end of the page and backtracked
+    ('target', r'average price target .{0,300}? is \$([0-9.]+)', _strip),
+    ('consensus', r'consensus rating is "([A-Za-z]+)"', _strip),
+    ('analyst_count', r'Analyst Count\s+([0-9]+)', _strip),
+    ('employees', r'Employee Count\s*([0-9,]+)', _strip),
+    ('rev_growth_5y', r'Revenue Growth Forecast \(5Y\)\s*([0-9.]+%)', _strip),
+    ('op_margin', r'Operating Margin\s*([0-9.]+%)', _strip),
+])
+# statistics-table row labels per field, read from the same single parse
+STAT_LABELS = {
+    'market_cap': ('Market Cap',),
+    'pe': ('PE Ratio',),
+    'fpe': ('Forward PE',),
+    'ev_ebitda': ('EV / EBITDA',),
+    'de': ('Debt / Equity',),
+    'roe': ('Return on Equity (ROE)',),
+    'eps': ('EPS (ttm)',),
+    'fcf_yield': ('FCF Yield',),
+    'target': ('Price Target',),
+    'consensus': ('Analyst Consensus',),
+    'analyst_count': ('Analyst Count',),
+    'employees': ('Employees', 'Employee Count'),
+    'rev_growth_5y': ('Revenue Growth Forecast (5Y)',),
+    'op_margin': ('Operating Margin',),
+}
+
+
+def parse_statistics(page):
+    """Statistics fields from one parsed /statistics/ page: table rows first, one regex scan for the rest."""
+    out = {}
+    for name, labels in STAT_LABELS.items():
+        v = table_value(page, *labels)
+        if v is not None:
+            out[name] = v
+            STAT_FIELDS.count(name, 'table')
+    out.update(STAT_FIELDS.scan(page.text, page.low, only={n for n, *_ in STAT_FIELDS.specs} - set(out)))
+    return {name: out.get(name) for name, *_ in STAT_FIELDS.specs}
@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpoint import Checkpoint  # noqa: E402
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'memory', 'run-checkpoint.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def lines(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_resume_points_survive_reopen(self):
+        cp = Checkpoint(self.path)
+        cp.mark('AAA', 'fetched', data={'price': 1})
+        cp.mark('BBB', 'fetched', data={'price': 2})
+        cp.mark('BBB', 'rendered', blocks=[{'type': 'divider'}])
+        cp.mark('CCC', 'fetched', data={'price': 3})
+        cp.mark('CCC', 'rendered', blocks=[])
+        cp.mark('CCC', 'written')
+        cp.fail('AAA', 'HTTPError:502')
+
+        cp = Checkpoint(self.path)
+        stage, e = cp.resume_point('AAA')
+        self.assertEqual((stage, e['data'], e['error']), ('fetched', {'price': 1}, 'HTTPError:502'))
+        stage, e = cp.resume_point('BBB')
+        self.assertEqual((stage, e['data'], e['blocks']), ('rendered', {'price': 2}, [{'type': 'divider'}]))
+        stage, e = cp.resume_point('CCC')
+        self.assertEqual(stage, 'written')
+        self.assertNotIn('data', e)
+        self.assertEqual(cp.resume_point('DDD'), (None, None))
+
+    def test_mark_appends_only_its_own_payload(self):
+        cp = Checkpoint(self.path)
+        big = {'rows': list(range(1000))}
+        sizes = []
+        for i in range(20):
+            cp.mark(f'T{i}', 'fetched', data=big)
+            sizes.append(os.path.getsize(self.path))
+        growth = [b - a for a, b in zip(sizes, sizes[1:])]
+        # about one payload per mark, not proportional to the journal size
+        self.assertLess(max(growth) - min(growth), 50)
+        self.assertEqual(len(self.lines()), 20)
+
+    def test_reopen_compacts_superseded_lines(self):
+        cp = Checkpoint(self.path)
+        cp.mark('AAA', 'fetched', data={'rows': list(range(100))})
+        cp.mark('AAA', 'rendered', blocks=[1, 2, 3])
+        cp.mark('AAA', 'written')
+        Checkpoint(self.path)
+        self.assertEqual([(r['key'], r['stage']) for r in self.lines()], [('AAA', 'written')])
+        self.assertNotIn('data', self.lines()[0])
+
+    def test_expired_entries_are_dropped(self):
+        cp = Checkpoint(self.path, max_age=60)
+        cp.mark('OLD', 'fetched', data={})
+        cp.mark('NEW', 'fetched', data={})
+        records = self.lines()
+        records[0]['at'] = time.time() - 120
+        with open(self.path, 'w') as f:
+            f.writelines(json.dumps(r) + '\n' for r in records)
+        cp = Checkpoint(self.path, max_age=60)
+        self.assertEqual(cp.resume_point('OLD'), (None, None))
+        self.assertEqual(cp.resume_point('NEW')[0], 'fetched')
+        self.assertEqual([r['key'] for r in self.lines()], ['NEW'])
+
+    def test_torn_last_line_is_ignored(self):
+        cp = Checkpoint(self.path)
+        cp.mark('AAA', 'rendered', blocks=[])
+        with open(self.path, 'a') as f:
+            f.write('{"key": "BBB", "stage": "fetch')
+        cp = Checkpoint(self.path)
+        self.assertEqual(cp.resume_point('AAA')[0], 'rendered')
+        self.assertEqual(cp.resume_point('BBB'), (None, None))
+
+    def test_shards_share_one_journal(self):
+        # two shards of a 2-way run, then a 3-way rerun: every ticker's progress is still there
+        a, b = Checkpoint(self.path), Checkpoint(self.path)
+        a.mark('AAA', 'written')
+        b.mark('BBB', 'rendered', blocks=['x'])
+        a.mark('CCC', 'fetched', data={'p': 1})
+        cp = Checkpoint(self.path)
+        self.assertEqual({k: cp.resume_point(k)[0] for k in ('AAA', 'BBB', 'CCC')},
+                         {'AAA': 'written', 'BBB': 'rendered', 'CCC': 'fetched'})
+
+
+if __name__ == '__main__':
+    unittest.main()
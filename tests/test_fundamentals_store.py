@@ -0,0 +1,86 @@
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fundamentals_store import MAGIC, FundamentalsStore  # noqa: E402
+from http_tape import Tape  # noqa: E402
+from research_providers import YahooProvider  # noqa: E402
+
+SA_ROWS = [('2024', 100.0, 10.0, 8.0, 5.0), ('2023', 90.0, 9.0, 7.0, 4.0)]
+YAHOO_ROWS = [('2025', 120.0, 12.0, 9.0, 6.0)]
+
+
+class StubYahoo(YahooProvider):
+    """YahooProvider whose timeseries endpoint is a canned answer."""
+
+    def __init__(self, store):
+        super().__init__(Tape(), store=store, store_ttl=3600)
+        self.calls = []
+
+    def timeseries(self, ticker, since=None, n=5):
+        self.calls.append((ticker, since))
+        return YAHOO_ROWS
+
+
+class FreshnessTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'fundamentals.col')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_is_per_source(self):
+        store = FundamentalsStore(self.path)
+        store.upsert('AAA', SA_ROWS, 'stockanalysis')
+        self.assertTrue(store.fresh('AAA', 3600, 'stockanalysis'))
+        self.assertFalse(store.fresh('AAA', 3600, 'yahoo'))
+        self.assertTrue(store.fresh('AAA', 3600))  # any source
+        self.assertFalse(store.fresh('BBB', 3600))
+
+    def test_yahoo_still_fetches_after_stockanalysis_upsert(self):
+        store = FundamentalsStore(self.path)
+        store.upsert('AAA', SA_ROWS, 'stockanalysis')
+        yahoo = StubYahoo(store)
+        rows = yahoo.history('AAA')
+        self.assertEqual(yahoo.calls, [('AAA', 2024)])
+        self.assertEqual([r[0] for r in rows], ['2025', '2024', '2023'])
+        yahoo.history('AAA')
+        self.assertEqual(len(yahoo.calls), 1)  # now fresh for yahoo itself
+
+    def test_refresh_times_survive_save_and_merge(self):
+        a = FundamentalsStore(self.path)
+        a.upsert('AAA', YAHOO_ROWS, 'yahoo')
+        a.save()
+        b = FundamentalsStore(self.path)
+        b.upsert('BBB', SA_ROWS, 'stockanalysis')
+        b.save()
+        store = FundamentalsStore(self.path)
+        self.assertTrue(store.fresh('AAA', 3600, 'yahoo'))
+        self.assertFalse(store.fresh('BBB', 3600, 'yahoo'))
+        self.assertTrue(store.fresh('BBB', 3600, 'stockanalysis'))
+
+    def test_reads_store_with_one_refresh_time_per_ticker(self):
+        store = FundamentalsStore(self.path)
+        store.upsert('AAA', SA_ROWS, 'yahoo')
+        store.save()
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        n = struct.unpack('<I', raw[len(MAGIC):len(MAGIC) + 4])[0]
+        head = json.loads(raw[len(MAGIC) + 4:len(MAGIC) + 4 + n])
+        head['fetched'] = {'AAA': head['fetched']['AAA']['yahoo']}
+        new = json.dumps(head).encode('utf-8')
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(new)) + new + raw[len(MAGIC) + 4 + n:])
+        store = FundamentalsStore(self.path)
+        self.assertEqual(store.history('AAA', 5)[0][0], '2024')
+        self.assertTrue(store.fresh('AAA', 3600))
+        self.assertFalse(store.fresh('AAA', 3600, 'yahoo'))  # unattributed: refetched once
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from urllib import error
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notion_api import NotionClient  # noqa: E402
+
+
+class MockServer:
+    """Raw keep-alive HTTP server; each request consumes the next scripted reply.
+
+    A reply is a status code, 'drop' (close without answering) or 'hang'
+    (answer nothing until the client has timed out). Once the script is used up
+    every request gets 200 {}.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(8)
+        self.base = f'http://127.0.0.1:{self.sock.getsockname()[1]}'
+        self.script, self.log = [], []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def reset(self, *script):
+        with self._lock:
+            self.script, self.log = list(script), []
+
+    def _accept(self):
+        while True:
+            conn, _ = self.sock.accept()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        f = conn.makefile('rb')
+        with conn:
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                length = 0
+                for h in iter(f.readline, b'\r\n'):
+                    k, _, v = h.decode().partition(':')
+                    if k.lower() == 'content-length':
+                        length = int(v)
+                f.read(length)
+                with self._lock:
+                    self.log.append(' '.join(line.decode().split()[:2]))
+                    reply = self.script.pop(0) if self.script else 200
+                if reply == 'drop':
+                    return
+                if reply == 'hang':
+                    time.sleep(1.0)
+                    return
+                body = b'{}' if reply == 200 else b'{"object": "error"}'
+                extra = b'Retry-After: 0\r\n' if reply == 429 else b''
+                conn.sendall(b'HTTP/1.1 %d X\r\nContent-Type: application/json\r\n%sContent-Length: %d\r\n\r\n%s'
+                             % (reply, extra, len(body), body))
+
+
+# (name, method, path, scripted replies, expected exception or None, requests the server saw)
+CASES = [
+    ('append not replayed after 5xx', 'PATCH', '/v1/blocks/x/children', [502], error.HTTPError, 1),
+    ('append not replayed after drop', 'PATCH', '/v1/blocks/x/children', ['drop'], OSError, 1),
+    ('append not replayed after timeout', 'PATCH', '/v1/blocks/x/children', ['hang'], OSError, 1),
+    ('page create not replayed after 5xx', 'POST', '/v1/pages', [500], error.HTTPError, 1),
+    ('page create not replayed after timeout', 'POST', '/v1/pages', ['hang'], OSError, 1),
+    ('append retried after 429', 'PATCH', '/v1/blocks/x/children', [429], None, 2),
+    ('page create retried after 429', 'POST', '/v1/pages', [429, 429], None, 3),
+    ('GET retried after 5xx', 'GET', '/v1/blocks/x', [503], None, 2),
+    ('GET retried after drop', 'GET', '/v1/blocks/x', ['drop'], None, 2),
+    ('GET retried after timeout', 'GET', '/v1/blocks/x', ['hang'], None, 2),
+    ('block update retried after 5xx', 'PATCH', '/v1/blocks/x', [500], None, 2),
+]
+
+
+class NotionClientRetryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer()
+
+    def test_cases(self):
+        for name, method, path, script, exc, sent in CASES:
+            with self.subTest(name):
+                client = NotionClient('test-key', base=self.server.base, rate=None, retries=2, timeout=0.5)
+                self.server.reset(*script)
+                payload = None if method == 'GET' else {'children': []}
+                if exc:
+                    with self.assertRaises(exc):
+                        client.request(method, path, payload)
+                else:
+                    self.assertEqual(client.request(method, path, payload), {})
+                self.assertEqual(self.server.log, [f'{method} {path}'] * sent)
+
+    def test_stale_pooled_connection_is_not_replayed_for_append(self):
+        client = NotionClient('test-key', base=self.server.base, rate=None, retries=2, timeout=0.5)
+        self.server.reset()
+        client.request('GET', '/v1/users/me')
+        self.server.reset('drop')
+        with self.assertRaises(OSError):
+            client.request('PATCH', '/v1/blocks/x/children', {'children': []})
+        self.assertEqual(self.server.log, ['PATCH /v1/blocks/x/children'])
+
+
+if __name__ == '__main__':
+    unittest.main()
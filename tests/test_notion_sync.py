@@ -0,0 +1,110 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notion_api import NotionClient, block_sig, diff_children  # noqa: E402
+
+
+def para(text, type_='paragraph', bid=None):
+    b = {'type': type_, type_: {'rich_text': [{'type': 'text', 'text': {'content': text}}]}}
+    if bid:
+        b['id'] = bid
+    return b
+
+
+def page(spec):
+    """'h:Title p:a p:b' -> existing blocks with ids b0, b1, ..."""
+    types = {'h': 'heading_2', 'p': 'paragraph'}
+    return [para(t, types[k], f'b{i}') for i, (k, t) in enumerate(w.split(':') for w in spec.split())]
+
+
+def local(spec):
+    return [{k: v for k, v in b.items() if k != 'id'} for b in page(spec)]
+
+
+class FakeClient(NotionClient):
+    """sync_children against an in-memory page instead of the API."""
+
+    def __init__(self, children):
+        super().__init__('test-key', rate=None)
+        self.children = [dict(b) for b in children]
+        self.calls = []
+        self._next = 0
+
+    def iter_children(self, block_id, prefetch=False):
+        return iter([dict(b) for b in self.children])
+
+    def _index(self, bid):
+        return next(i for i, b in enumerate(self.children) if b['id'] == bid)
+
+    def request(self, method, path, payload=None):
+        self.calls.append((method, path))
+        bid = path.rsplit('/', 1)[-1]
+        if payload.get('archived'):
+            del self.children[self._index(bid)]
+        else:
+            b = self.children[self._index(bid)]
+            b[b['type']] = {'rich_text': payload[b['type']]['rich_text']}
+        return {}
+
+    def append_children(self, block_id, blocks, after=None, chunk=80):
+        self.calls.append(('APPEND', after))
+        at = self._index(after) + 1 if after else len(self.children)
+        created = []
+        for b in blocks:
+            self._next += 1
+            created.append(dict(b, id=f'n{self._next}'))
+        self.children[at:at] = created
+        return created
+
+
+# (name, existing page, new blocks, expected counters kept/updated/inserted/archived)
+CASES = [
+    ('unchanged', 'h:A p:a p:b', 'h:A p:a p:b', (3, 0, 0, 0)),
+    ('text changed in place', 'h:A p:a p:b', 'h:A p:x p:b', (2, 1, 0, 0)),
+    ('insert in the middle', 'h:A p:a p:b', 'h:A p:a p:new p:b', (3, 0, 1, 0)),
+    ('append at the end', 'h:A p:a', 'h:A p:a p:b p:c', (2, 0, 2, 0)),
+    ('delete from the middle', 'h:A p:a p:b p:c', 'h:A p:a p:c', (3, 0, 0, 1)),
+    ('delete the tail', 'h:A p:a p:b p:c', 'h:A', (1, 0, 0, 3)),
+    ('reorder', 'h:A p:a p:b p:c', 'h:A p:c p:a p:b', (3, 0, 1, 1)),
+    # no surviving block to anchor the leading insert on: rewrite the whole page
+    ('reorder sections', 'h:A p:a h:B p:b', 'h:B p:b h:A p:a', (0, 0, 4, 4)),
+    ('type changed', 'h:A p:a', 'h:A h:a', (1, 0, 1, 1)),
+    ('leading insert', 'p:a p:b', 'h:T p:a p:b', (0, 0, 3, 2)),
+    ('empty page', '', 'h:A p:a', (0, 0, 2, 0)),
+    ('clear page', 'h:A p:a', '', (0, 0, 0, 2)),
+]
+
+
+class SyncChildrenTest(unittest.TestCase):
+    def test_cases(self):
+        for name, old, new, expected in CASES:
+            with self.subTest(name):
+                fake = FakeClient(page(old) if old else [])
+                blocks = local(new) if new else []
+                out = fake.sync_children('page', blocks)
+                self.assertEqual([block_sig(b) for b in fake.children], [block_sig(b) for b in blocks])
+                self.assertEqual((out['kept'], out['updated'], out['inserted'], out['archived']), expected)
+                self.assertEqual(out['archive_failed'], [])
+
+    def test_unchanged_page_makes_no_writes(self):
+        fake = FakeClient(page('h:A p:a p:b'))
+        fake.sync_children('page', local('h:A p:a p:b'))
+        self.assertEqual(fake.calls, [])
+
+    def test_archives_come_last(self):
+        fake = FakeClient(page('h:A p:a p:b'))
+        fake.sync_children('page', local('h:A p:b p:c'))
+        self.assertEqual(fake.calls, [('APPEND', 'b2'), ('PATCH', '/v1/blocks/b1')])
+
+    def test_diff_children_keeps_ids_of_surviving_blocks(self):
+        plan = diff_children(page('h:A p:a p:b'), local('h:A p:a p:new p:b'))
+        self.assertEqual(plan, [('keep', 'b0', None), ('keep', 'b1', None), ('insert', 'b1', local('p:new')), ('keep', 'b2', None)])
+
+    def test_diff_children_leading_insert_needs_fallback(self):
+        self.assertIsNone(diff_children(page('p:a'), local('h:T p:a')))
+
+
+if __name__ == '__main__':
+    unittest.main()